@@ -7,8 +7,44 @@ __license__ = "GPL"
 __status__ = "Development"
 """
 import re
-from collections import Counter
-from typing import List
+import string
+from functools import lru_cache
+from typing import List, Sequence, Tuple, Union
+
+# Die 26 verschobenen Alphabete als Übersetzungstabellen, einmal beim Import berechnet.
+# Eine bytes-Tabelle funktioniert sowohl mit bytes.translate als auch mit str.translate.
+SHIFT_TABLES = tuple(
+    bytes.maketrans(string.ascii_lowercase.encode(),
+                    (string.ascii_lowercase[shift:] + string.ascii_lowercase[:shift]).encode())
+    for shift in range(26)
+)
+
+# Alle Bytes, die keine Kleinbuchstaben sind (werden im bytes-Pfad entfernt)
+NON_LETTER_BYTES = bytes(b for b in range(256) if not ord('a') <= b <= ord('z'))
+
+# Buchstabenhäufigkeiten in Prozent für a bis z
+LANGUAGES = {
+    "de": (6.51, 1.89, 3.06, 5.08, 17.40, 1.66, 3.01, 4.76, 7.55, 0.27, 1.21, 3.44, 2.53,
+           9.78, 2.51, 0.79, 0.02, 7.00, 7.27, 6.15, 4.35, 0.67, 1.89, 0.03, 0.04, 1.13),
+    "en": (8.167, 1.492, 2.782, 4.253, 12.702, 2.228, 2.015, 6.094, 6.966, 0.153, 0.772, 4.025, 2.406,
+           6.749, 7.507, 1.929, 0.095, 5.987, 6.327, 9.056, 2.758, 0.978, 2.360, 0.150, 1.974, 0.074),
+}
+
+
+@lru_cache(maxsize=None)
+def rotation_matrix(frequencies: Tuple[float, ...]) -> Tuple[Tuple[float, ...], ...]:
+    """
+    Liefert die 26x26 Matrix R mit R[c][k] = 1 / p((c - k) mod 26), wobei p die relative Häufigkeit ist.
+    Damit ist der Chi-Quadrat-Wert für Schlüssel k: sum(h[c]^2 * R[c][k]) / n - n (h = Histogramm, n = Anzahl).
+    Die Matrix wird pro Sprachprofil nur einmal berechnet.
+
+    >>> round(rotation_matrix(LANGUAGES["de"])[4][0], 2)
+    5.75
+    >>> rotation_matrix(LANGUAGES["de"])[5][1] == rotation_matrix(LANGUAGES["de"])[4][0]
+    True
+    """
+    total = sum(frequencies)
+    return tuple(tuple(total / frequencies[(c - k) % 26] for k in range(26)) for c in range(26))
 
 
 class Caesar:
@@ -36,7 +72,56 @@ class Caesar:
 
         return re.sub(r'[^a-z]', '', plaintext.lower())
 
-    def encrypt(self, plaintext: str, key: str = None) -> str:
+    def to_key(self, key: Union[int, str, None] = None) -> int:
+        """
+        Converts the given key (or the default key of the object) to a shift between 0 and 25.
+
+        >>> Caesar().to_key("c")
+        2
+        >>> Caesar("b").to_key()
+        1
+        >>> Caesar().to_key(-1)
+        25
+        >>> Caesar().to_key("C")
+        Traceback (most recent call last):
+           ...
+        ValueError: Key must be an integer or a single lowercase letter.
+
+        :param key: int or single lowercase letter, if None the key of the object is used
+        :return: shift between 0 and 25
+        """
+        if key is None:
+            key = self.key
+        if isinstance(key, str) and len(key) == 1 and key.islower():
+            key = ord(key) - ord('a')
+        elif not isinstance(key, int):
+            raise ValueError("Key must be an integer or a single lowercase letter.")
+        return key % 26
+
+    def translate(self, text: Union[str, bytes, bytearray], shift: int) -> Union[str, bytes]:
+        """
+        Normalises the text and shifts every letter by shift in one single pass.
+        ASCII input (str or bytes/bytearray) is translated on bytes level, bytes input returns bytes.
+
+        >>> Caesar().translate("Hallo, Welt!", 1)
+        'ibmmpxfmu'
+        >>> Caesar().translate(b"Hallo, Welt!", 25)
+        b'gzkknvdks'
+        >>> Caesar().translate("Grüße", 0)
+        'gre'
+
+        :param text: text to translate
+        :param shift: shift between 0 and 25
+        :return: translated text
+        """
+        table = SHIFT_TABLES[shift % 26]
+        if isinstance(text, (bytes, bytearray)):
+            return text.lower().translate(table, NON_LETTER_BYTES)
+        if text.isascii():
+            return text.encode('ascii').lower().translate(table, NON_LETTER_BYTES).decode('ascii')
+        return self.to_lowercase_letter_only(text).translate(table)
+
+    def encrypt(self, plaintext: Union[str, bytes], key: Union[int, str] = None) -> Union[str, bytes]:
         """
         Encrypts the given plaintext with the given key.
         :param plaintext:
@@ -58,21 +143,13 @@ class Caesar:
 
         >>> caesar5 = Caesar();caesar5.encrypt("xyz", "c")
         'zab'
-        """
-        if key is None:
-            key = self.key
-        elif isinstance(key, str) and len(key) == 1 and key.islower():
-            key = ord(key) - ord('a')
-        elif not isinstance(key, int):
-            raise ValueError("Key must be an integer or a single lowercase letter.")
 
-        plaintext = self.to_lowercase_letter_only(plaintext)
-        ciphertext = ""
-        for c in plaintext:
-            ciphertext += chr((ord(c) - ord('a') + key) % 26 + ord('a'))
-        return ciphertext
+        >>> caesar6 = Caesar("c");caesar6.encrypt(b"Hallo")
+        b'jcnnq'
+        """
+        return self.translate(plaintext, self.to_key(key))
 
-    def decrypt(self, ciphertext: str, key: str = None) -> str:
+    def decrypt(self, ciphertext: Union[str, bytes], key: Union[int, str] = None) -> Union[str, bytes]:
         """
         Decrypts the given ciphertext with the given key.
 
@@ -80,38 +157,64 @@ class Caesar:
         :param key: is a letter that defines how many letters the alphabet is shifted
         if no key is given, the default key is taken by the property
         :return:
+
+        >>> caesar = Caesar();caesar.decrypt(b"ibmmp")
+        b'hallo'
         """
-        if key is None:
-            key = self.key
-        elif isinstance(key, str) and len(key) == 1 and key.islower():
-            key = ord(key) - ord('a')
-        elif not isinstance(key, int):
-            raise ValueError("Key must be an integer or a single lowercase letter.")
+        return self.translate(ciphertext, -self.to_key(key))
 
-        ciphertext = self.to_lowercase_letter_only(ciphertext)
-        plaintext = ""
-        for c in ciphertext:
-            plaintext += chr((ord(c) - ord('a') - key) % 26 + ord('a'))
-        return plaintext
+    def histogram(self, text: Union[str, bytes]) -> List[int]:
+        """
+        Counts every letter a to z of the normalised text.
+
+        >>> Caesar().histogram("Hallo")[:12]
+        [1, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 2]
 
-    def crack(self, crypttext: str, elements: int = 1) -> List[str]:
+        :param text:
+        :return: list with 26 counts
         """
-        Calculates a List with the most likely keys for the given crypttext.
+        data = self.translate(text, 0)
+        if isinstance(data, str):
+            data = data.encode('ascii')
+        return [data.count(letter) for letter in range(ord('a'), ord('z') + 1)]
 
-        >>> str='Vor einem großen Walde wohnte ein armer Holzhacker mit seiner Frau und seinen zwei Kindern; das Bübchen hieß Hänsel und das Mädchen Gretel. Er hatte wenig zu beißen und zu brechen, und einmal, als große Teuerung ins Land kam, konnte er das tägliche Brot nicht mehr schaffen. Wie er sich nun abends im Bette Gedanken machte und sich vor Sorgen herumwälzte, seufzte er und sprach zu seiner Frau: "Was soll aus uns werden? Wie können wir unsere armen Kinder ernähren da wir für uns selbst nichts mehr haben?"'; caeser = Caesar(); caeser.crack(str)
-        ['a']
+    def scores(self, histograms: Sequence[Sequence[int]], language: Union[str, Sequence[float]] = "de") \
+            -> List[List[float]]:
+        """
+        Calculates the chi-squared value of all 26 keys for every histogram in one matrix multiplication
+        with the rotation matrix of the language. The smaller the value, the more likely the key.
 
-        >>> caesar = Caesar(); caesar.crack(str, 100) # mehr als 26 können es nicht sein
-        ['a', 'j', 'n', 'o', 'e', 'w', 'd', 'q', 'z', 'p', 'i', 'h', 'y', 's', 'k', 'x', 'c', 'v', 'g', 'b', 'r', 'l']
+        >>> scores = Caesar().scores([Caesar().histogram("eeeeeeeee"), Caesar().histogram("fffffffff")])
+        >>> scores[0].index(min(scores[0])), scores[1].index(min(scores[1]))
+        (0, 1)
 
-        >>> crypted = caeser.encrypt(str, "y"); caesar.crack(crypted, 3)
-        ['y', 'h', 'l']
+        :param histograms: list of histograms with 26 counts each
+        :param language: "de", "en" or 26 letter frequencies
+        :return: list with 26 chi-squared values for every histogram
+        """
+        frequencies = LANGUAGES[language] if isinstance(language, str) else language
+        matrix = rotation_matrix(tuple(frequencies))
+        result = []
+        for histogram in histograms:
+            n = sum(histogram) or 1
+            squares = [h * h for h in histogram]
+            result.append([sum(sq * row[k] for sq, row in zip(squares, matrix)) / n - n for k in range(26)])
+        return result
 
-        :param ciphertext:
-        :param elements: number of elements to return
-        :return:
+    def crack_many(self, crypttexts: Sequence[Union[str, bytes]], elements: int = 1,
+                   language: Union[str, Sequence[float]] = "de") -> List[List[str]]:
         """
+        Cracks many crypttexts (e.g. all columns of a Vigenere text) at once.
 
+        >>> texts = ["Es war einmal eine kleine suesse Dirne", "Guten Morgen, wie geht es dir heute?"]
+        >>> Caesar().crack_many([Caesar().encrypt(texts[0], "b"), Caesar().encrypt(texts[1], "q")])
+        [['b'], ['q']]
+
+        :param crypttexts:
+        :param elements: number of elements to return per crypttext
+        :param language: "de", "en" or 26 letter frequencies
+        :return: list with the most likely keys for every crypttext
+        """
         if not isinstance(elements, int):
             raise ValueError("elements must be an integer.")
         elif elements < 1:
@@ -119,6 +222,70 @@ class Caesar:
         elif elements > 26:
             elements = 26
 
-        return [self.decrypt(key, 'e') for key, _ in Counter(self.to_lowercase_letter_only(crypttext)).most_common(elements)]
+        scores = self.scores([self.histogram(text) for text in crypttexts], language)
+        return [[chr(ord('a') + k) for k in sorted(range(26), key=score.__getitem__)[:elements]] for score in scores]
+
+    def crack(self, crypttext: str, elements: int = 1, language: Union[str, Sequence[float]] = "de") -> List[str]:
+        """
+        Calculates a List with the most likely keys for the given crypttext.
+        The keys are ranked by the chi-squared distance to the letter frequencies of the language.
+
+        >>> str='Vor einem großen Walde wohnte ein armer Holzhacker mit seiner Frau und seinen zwei Kindern; das Bübchen hieß Hänsel und das Mädchen Gretel. Er hatte wenig zu beißen und zu brechen, und einmal, als große Teuerung ins Land kam, konnte er das tägliche Brot nicht mehr schaffen. Wie er sich nun abends im Bette Gedanken machte und sich vor Sorgen herumwälzte, seufzte er und sprach zu seiner Frau: "Was soll aus uns werden? Wie können wir unsere armen Kinder ernähren da wir für uns selbst nichts mehr haben?"'; caeser = Caesar(); caeser.crack(str)
+        ['a']
+
+        >>> caesar = Caesar(); len(caesar.crack(str, 100)) # mehr als 26 können es nicht sein
+        26
+
+        >>> crypted = caeser.encrypt(str, "y"); caesar.crack(crypted, 3)[0]
+        'y'
+
+        >>> caesar.crack(caesar.encrypt("The quick brown fox jumps over the lazy dog and keeps running", "k"), 1, "en")
+        ['k']
+
+        :param ciphertext:
+        :param elements: number of elements to return
+        :param language: "de", "en" or 26 letter frequencies
+        :return:
+        """
+        return self.crack_many([crypttext], elements, language)[0]
 
     pass
+
+
+def encrypt_loop(plaintext: str, key: int) -> str:
+    """
+    Alte zeichenweise Implementierung von Caesar.encrypt, nur als Vergleich für den Benchmark.
+    """
+    ciphertext = ""
+    for c in Caesar().to_lowercase_letter_only(plaintext):
+        ciphertext += chr((ord(c) - ord('a') + key) % 26 + ord('a'))
+    return ciphertext
+
+
+if __name__ == '__main__':
+    import doctest
+    import time
+
+    doctest.testmod()
+
+    caesar = Caesar()
+    sample = "Vor einem grossen Walde wohnte ein armer Holzhacker mit seiner Frau und seinen zwei Kindern. "
+    for mb in [1, 10, 100]:
+        text = sample * (mb * 1024 * 1024 // len(sample))
+
+        start = time.time()
+        old = encrypt_loop(text, 3)
+        time_old = time.time() - start
+
+        start = time.time()
+        new = caesar.encrypt(text, 3)
+        time_str = time.time() - start
+
+        data = text.encode('ascii')
+        start = time.time()
+        new_bytes = caesar.encrypt(data, 3)
+        time_bytes = time.time() - start
+
+        assert old == new == new_bytes.decode('ascii')
+        print(f"{mb:>4} MB: zeichenweise {time_old:.3f} s, str {time_str:.3f} s, bytes {time_bytes:.3f} s "
+              f"-> Faktor {time_old / time_str:.1f}x")
@@ -6,12 +6,16 @@ __copyright__ = "Copyright 2024"
 __license__ = "GPL"
 __status__ = "Development"
 """
-from collections import Counter
-from typing import List, Set, Tuple
+from collections import Counter, defaultdict
+from typing import Dict, List, Set, Tuple
 
 from py_Kasiski.Caesar.caesar import Caesar
 from py_Kasiski.Vigenere.vigenere import Vigenere
 
+# Koinzidenzindex eines deutschen Textes und eines gleichverteilten Zufallstextes
+IC_GERMAN = 0.0762
+IC_RANDOM = 1 / 26
+
 
 class Kasiski:
     def __init__(self, crypttext: str = ""):
@@ -79,14 +83,68 @@ class Kasiski:
         True
         """
         result = set()
-        for i in range(len(text) - laenge + 1):
-            substring = text[i:i + laenge]
-
-            pos = self.allpos(text, substring)
+        for substring, pos in self.ngram_positions(text, laenge).items():
+            pos = self.non_overlapping(pos, laenge)
             for j in range(len(pos)):
                 for k in range(j + 1, len(pos)):
-                    dist = pos[k] - pos[j]
-                    result.add((substring, dist))
+                    result.add((substring, pos[k] - pos[j]))
+        return result
+
+    def ngram_positions(self, text: str, laenge: int) -> Dict[str, List[int]]:
+        """
+        Sammelt in einem einzigen Durchlauf die Startpositionen aller Teilstrings mit der gegebenen laenge
+        und liefert nur die Teilstrings, die mehr als einmal vorkommen (auch überlappend).
+        Usage examples:
+        >>> k = Kasiski()
+        >>> k.ngram_positions("heissajuchei", 2)
+        {'he': [0, 9], 'ei': [1, 10]}
+        >>> k.ngram_positions("aaaa", 2)
+        {'aa': [0, 1, 2]}
+        """
+        positions = defaultdict(list)
+        for i in range(len(text) - laenge + 1):
+            positions[text[i:i + laenge]].append(i)
+        return {substring: pos for substring, pos in positions.items() if len(pos) > 1}
+
+    def non_overlapping(self, pos: List[int], laenge: int) -> List[int]:
+        """
+        Wählt aus den aufsteigend sortierten Positionen pos die Vorkommen aus, die allpos findet,
+        d.h. nach einem Treffer wird erst hinter dem Teilstring weitergesucht.
+        Usage examples:
+        >>> k = Kasiski()
+        >>> k.non_overlapping([0, 1, 2], 2) == k.allpos("aaaa", "aa")
+        True
+        """
+        result = []
+        for p in pos:
+            if not result or p >= result[-1] + laenge:
+                result.append(p)
+        return result
+
+    def repeats(self, text: str, min_laenge: int = 2, max_laenge: int = None) -> Dict[int, Dict[str, List[int]]]:
+        """
+        Findet alle wiederholten Teilstrings mit min_laenge <= Länge <= max_laenge in einem Aufbau.
+        Die Positionen für Länge n + 1 werden nur aus den Gruppen der Länge n verfeinert,
+        weil nur ein wiederholter Teilstring zu einem längeren wiederholten Teilstring wachsen kann.
+        Usage examples:
+        >>> k = Kasiski()
+        >>> k.repeats("heissajuchei")
+        {2: {'he': [0, 9], 'ei': [1, 10]}, 3: {'hei': [0, 9]}}
+        >>> k.repeats("heissajuchei", 3, 3)
+        {3: {'hei': [0, 9]}}
+        """
+        result = {}
+        laenge = min_laenge
+        groups = self.ngram_positions(text, laenge)
+        while groups and (max_laenge is None or laenge <= max_laenge):
+            result[laenge] = groups
+            laenge += 1
+            refined = defaultdict(list)
+            for pos in groups.values():
+                for p in pos:
+                    if p + laenge <= len(text):
+                        refined[text[p:p + laenge]].append(p)
+            groups = {substring: pos for substring, pos in refined.items() if len(pos) > 1}
         return result
 
     def dist_n_list(self, text: str, laenge: int) -> list[int]:
@@ -104,6 +162,24 @@ class Kasiski:
         dist = self.dist_n_tuple(text, laenge)
         return sorted(set([d for (_, d) in dist]))
 
+    def dist_n_consecutive(self, text: str, laenge: int) -> List[int]:
+        """
+        Wie dist_n_list, aber nur die Abstände aufeinanderfolgender Vorkommen jedes Teilstrings. Jeder andere
+        Abstand ist eine Summe davon, der ggT bleibt also gleich; statt quadratisch vieler Paare pro Teilstring
+        gibt es höchstens so viele Abstände wie Vorkommen, insgesamt linear in der Länge von text.
+        Usage examples:
+        >>> k = Kasiski()
+        >>> k.dist_n_consecutive("heissajucheieinei", 2)
+        [2, 3, 9]
+        >>> k.dist_n_consecutive("heissajucheieinei", 4)
+        []
+        """
+        dist = set()
+        for pos in self.ngram_positions(text, laenge).values():
+            pos = self.non_overlapping(pos, laenge)
+            dist.update(pos[i + 1] - pos[i] for i in range(len(pos) - 1))
+        return sorted(dist)
+
     def ggt(self, x: int, y: int) -> int:
         """
         Ermittelt den größten gemeinsamen Teiler von x und y. Mit dem Euclidischen Algorithmus.
@@ -144,12 +220,74 @@ class Kasiski:
         >>> k.get_nth_letter("Das ist kein kreativer Text.", 1, 4)
         'asektrx'
         """
-        return ''.join([s[i] for i in range(start, len(s), n)])
+        return s[start::n]
 
-    def crack_key(self, len: int) -> str:
+    def coincidence_index(self, text: bytes) -> float:
+        """
+        Berechnet den Koinzidenzindex, d.h. die Wahrscheinlichkeit, dass zwei zufällig gewählte
+        Buchstaben aus text gleich sind. text enthält nur Kleinbuchstaben.
+        Usage examples:
+        >>> k = Kasiski()
+        >>> k.coincidence_index(b"aabb")
+        0.3333333333333333
+        >>> k.coincidence_index(b"a")
+        0.0
+        """
+        if len(text) < 2:
+            return 0.0
+        counts = [text.count(letter) for letter in range(ord('a'), ord('z') + 1)]
+        return sum(c * (c - 1) for c in counts) / (len(text) * (len(text) - 1))
+
+    def friedman(self, text: bytes) -> float:
+        """
+        Schätzt die Schlüssellänge mit dem Friedman-Test aus dem Koinzidenzindex des ganzen Textes.
+        Usage examples:
+        >>> k = Kasiski()
+        >>> round(k.friedman(Vigenere().encrypt(open("../../py_argparse/rk.txt", "rb").read(), "hugo")))
+        5
         """
-        Crackt den Key mit der Länge len
-        :param len:
+        n = len(text)
+        ic = self.coincidence_index(text)
+        denominator = (n - 1) * ic - IC_RANDOM * n + IC_GERMAN
+        return (IC_GERMAN - IC_RANDOM) * n / denominator if denominator else 0.0
+
+    def key_length_ranking(self, max_laenge: int = 20, sample: int = 100000) -> List[Tuple[int, float]]:
+        """
+        Berechnet für jede mögliche Schlüssellänge 1 bis max_laenge den mittleren Koinzidenzindex der Spalten
+        (jeder n. Buchstabe) und liefert die Längen absteigend nach Koinzidenzindex sortiert.
+        Für die Statistik reichen die ersten sample Buchstaben, damit auch sehr große Texte schnell gehen.
+        Usage examples:
+        >>> k = Kasiski(Vigenere().encrypt(open("../../py_argparse/rk.txt").read(), "hugo"))
+        >>> [laenge for laenge, _ in k.key_length_ranking(8)[:2]]
+        [8, 4]
+        """
+        text = Caesar().translate(self.crypttext, 0)
+        text = (text if isinstance(text, bytes) else text.encode('ascii'))[:sample]
+        ranking = []
+        for laenge in range(1, max_laenge + 1):
+            columns = [self.coincidence_index(text[i::laenge]) for i in range(laenge)]
+            ranking.append((laenge, sum(columns) / laenge))
+        return sorted(ranking, key=lambda x: x[1], reverse=True)
+
+    def estimate_key_length(self, max_laenge: int = 20, tolerance: float = 0.9) -> int:
+        """
+        Schätzt die Schlüssellänge aus key_length_ranking. Vielfache der echten Länge haben einen
+        ähnlich hohen Koinzidenzindex, deshalb wird die kleinste Länge gewählt, deren Index nahe am besten liegt.
+        Usage examples:
+        >>> k = Kasiski(Vigenere().encrypt(open("../../py_argparse/rk.txt").read(), "hugo"))
+        >>> k.estimate_key_length()
+        4
+        """
+        ranking = self.key_length_ranking(max_laenge)
+        best = ranking[0][1]
+        return min(laenge for laenge, ic in ranking if ic >= best * tolerance)
+
+    def crack_key(self, len: int, key_length: int = None) -> str:
+        """
+        Crackt den Key mit der Länge len. Der Text wird vorher normalisiert (nur Kleinbuchstaben), damit
+        Leerzeichen, Satzzeichen und Zeilenumbrüche die Spalten nicht verschieben.
+        :param len: Länge der Teilstrings, deren Abstände die Schlüssellänge ergeben
+        :param key_length: bekannte Schlüssellänge, dann werden die Abstände nicht berechnet
         :return:
 
         >>> string: str = 'In der faszinierenden Welt der Netzwerktechnik erstrecken sich endlose Möglichkeiten. Netzwerke sind essenziell für die Kommunikation zwischen Geräten, wobei Ethernet-Kabel, Switches und Router eine zentrale Rolle spielen. Sie ermöglichen ein reibungsloses Datenmanagement, wobei das Internetprotokoll (IP) als grundlegende Struktur dient. Ein effizientes Netzwerk erfordert sorgfältige Planung, um Engpässe zu vermeiden. Die ständige Evolution führt zu neuen Technologien wie 5G und Edge Computing. Die Sicherheit von Netzwerken ist ebenfalls von höchster Bedeutung, wobei Firewalls und Verschlüsselung eine entscheidende Schutzschicht bieten. Insgesamt ist die Netzwerktechnik ein vitaler Bestandteil unseres digitalen Zeitalters.'
@@ -162,18 +300,25 @@ class Kasiski:
         >>> kasiski = Kasiski(crypt_str)
         >>> kasiski.crack_key(4)
         'hugo'
+        >>> kasiski.crack_key(4, kasiski.estimate_key_length())
+        'hugo'
+        >>> wrapped = "\\n".join(crypt_str[i:i + 37] for i in range(0, 1000, 37))
+        >>> Kasiski(wrapped).crack_key(4, 4)
+        'hugo'
         """
         try:
-            substr_distances = self.dist_n_list(self.crypttext, len) # Abstände der Teilstrings
+            text = Caesar().translate(self.crypttext, 0)
+            if key_length is None:
+                substr_distances = self.dist_n_consecutive(text, len) # Abstände der Teilstrings
 
-            factors_counter = self.ggt_count(substr_distances) # Counter mit den häufigsten Abständen
+                factors_counter = self.ggt_count(substr_distances) # Counter mit den häufigsten Abständen
 
-            key_length = factors_counter.most_common(1)[0][0] # häufigster Abstand
+                key_length = factors_counter.most_common(1)[0][0] # häufigster Abstand
 
-            potential_keys = [self.get_nth_letter(self.crypttext, i, key_length) for i in range(key_length)] # mögliche Schlüssel
+            potential_keys = [self.get_nth_letter(text, i, key_length) for i in range(key_length)] # mögliche Schlüssel
 
             caesar = Caesar()
-            return "".join([caesar.crack(key)[0] for key in potential_keys]) # Schlüssel cracken
+            return "".join([keys[0] for keys in caesar.crack_many(potential_keys)]) # alle Spalten auf einmal cracken
         except Exception as e:
             print(f"Error: {e}")
             return ""
@@ -6,8 +6,16 @@ __copyright__ = "Copyright 2024"
 __license__ = "GPL"
 __status__ = "Development"
 """
+from typing import List, Union
 
-from py_Kasiski.Caesar.caesar import Caesar
+from py_Kasiski.Caesar.caesar import Caesar, SHIFT_TABLES
+
+try:
+    import numpy as np
+except ImportError:  # numpy ist optional, ohne numpy gibt es nur das Python-Backend
+    np = None
+
+BACKENDS = ("python", "numpy")
 
 
 class Vigenere:
@@ -15,14 +23,71 @@ class Vigenere:
     Vigenere cipher class.
     """
 
-    def __init__(self, key: str = "a"):
+    def __init__(self, key: str = "a", backend: str = "python"):
         """
         Constructor.
         :param key: Key to use for encryption and decryption
+        :param backend: "python" (translate tables) or "numpy" (vectorized over uint8 arrays)
+
+        >>> Vigenere(backend="java")
+        Traceback (most recent call last):
+           ...
+        ValueError: backend must be one of ('python', 'numpy').
         """
+        if backend not in BACKENDS:
+            raise ValueError(f"backend must be one of {BACKENDS}.")
+        if backend == "numpy" and np is None:
+            raise ValueError("backend numpy requires numpy to be installed.")
         self.key = key
+        self.backend = backend
 
-    def encrypt (self, plaintext: str, key: str = None) -> str:
+    def shifts(self, key: str) -> List[int]:
+        """
+        Converts every letter of the key to its shift.
+
+        >>> Vigenere().shifts("Hugo")
+        [7, 20, 6, 14]
+
+        :param key:
+        :return: list of shifts between 0 and 25
+        """
+        caesar = Caesar()
+        return [caesar.to_key(k) for k in key.lower()]
+
+    def shift_text(self, text: Union[str, bytes], shifts: List[int]) -> Union[str, bytes]:
+        """
+        Normalises the text and shifts the i-th letter by shifts[i % len(shifts)].
+        Both backends return exactly the same result.
+
+        >>> Vigenere().shift_text("Hallo, wie geht es dir?", [7, 20, 6, 14])
+        'ourzvqosnynhlmjwy'
+        >>> Vigenere().shift_text(b"hallo", [1, 0])
+        b'iamlp'
+        >>> text = "Hallo, wie geht es dir?" * 7
+        >>> np is None or Vigenere(backend="numpy").shift_text(text, [7, 20, 6]) == Vigenere().shift_text(text, [7, 20, 6])
+        True
+
+        :param text: str or bytes
+        :param shifts: list of shifts between 0 and 25
+        :return: shifted text, same type as text
+        """
+        normalized = Caesar().translate(text, 0)
+        data = normalized if isinstance(normalized, bytes) else normalized.encode('ascii')
+
+        if self.backend == "numpy":
+            letters = np.frombuffer(data, dtype=np.uint8) - ord('a')
+            offsets = np.resize(np.array(shifts, dtype=np.uint8), len(letters))
+            result = ((letters + offsets) % 26 + ord('a')).astype(np.uint8).tobytes()
+        else:
+            # jede Schlüsselposition ist eine Caesar-Spalte, die mit einer Tabelle übersetzt wird
+            out = bytearray(len(data))
+            for i, shift in enumerate(shifts):
+                out[i::len(shifts)] = data[i::len(shifts)].translate(SHIFT_TABLES[shift])
+            result = bytes(out)
+
+        return result if isinstance(normalized, bytes) else result.decode('ascii')
+
+    def encrypt (self, plaintext: Union[str, bytes], key: str = None) -> Union[str, bytes]:
         """
         Encrypts the given plaintext with Vigenere and the given key.
 
@@ -43,12 +108,9 @@ class Vigenere:
         if key is None:
             key = self.key
 
-        key = key.lower()
-        caesar = Caesar()
-        plaintext = caesar.to_lowercase_letter_only(plaintext)
-        return ''.join([caesar.encrypt(plaintext[i], key[i % len(key)]) for i in range(len(plaintext))])
+        return self.shift_text(plaintext, self.shifts(key))
 
-    def decrypt (self, crypttext: str, key: str = None) -> str:
+    def decrypt (self, crypttext: Union[str, bytes], key: str = None) -> Union[str, bytes]:
         """
         Decrypts the given crypttext with Vigenere and the given key.
 
@@ -58,6 +120,9 @@ class Vigenere:
         >>> vigenere2 = Vigenere("hugo");vigenere2.decrypt("ourzvqosnynhlmjwy")
         'hallowiegehtesdir'
 
+        >>> vigenere2.decrypt(b"ourzvqosnynhlmjwy")
+        b'hallowiegehtesdir'
+
         :param crypttext:
         :param key:
         :return:
@@ -66,9 +131,7 @@ class Vigenere:
         if key is None:
             key = self.key
 
-        key = key.lower()
-        caesar = Caesar()
-        return ''.join([caesar.decrypt(crypttext[i], key[i % len(key)]) for i in range(len(crypttext))])
+        return self.shift_text(crypttext, [-shift % 26 for shift in self.shifts(key)])
 
     pass
 
@@ -8,7 +8,12 @@ __status__ = "Development"
 """
 
 import argparse
+import glob
+import json
+import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 # Assuming the necessary classes are in a module named py_Kasiski within the same directory or properly installed
 from py_Kasiski.Caesar.caesar import Caesar
@@ -16,15 +21,129 @@ from py_Kasiski.Vigenere.vigenere import Vigenere
 from py_Kasiski.Kasiski.kasiski import Kasiski
 
 
+def positive_int(value: str) -> int:
+    """
+    argparse type for integers >= 1.
+
+    >>> positive_int("4")
+    4
+    >>> positive_int("-1")
+    Traceback (most recent call last):
+    ...
+    argparse.ArgumentTypeError: -1 is not a positive integer
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive integer")
+    return number
+
+
 def parse_args():
     parser = argparse.ArgumentParser(description='Crack Caesar and Vigenere encrypted files.')
-    parser.add_argument('infile', type=str, help='File to be cracked')
+    parser.add_argument('infile', type=str, nargs='+',
+                        help='Files, directories or glob patterns to be cracked; more than one file gives JSON lines')
     parser.add_argument('-c', '--cipher', choices=['caesar', 'c', 'vigenere', 'v'], required=True, help='Cipher to use')
     parser.add_argument('-v', '--verbose', action='store_true', help='Verbose output, display more information')
     parser.add_argument('-q', '--quiet', action='store_true', help='Quiet mode, display only the key')
+    parser.add_argument('-m', '--max-key-length', type=positive_int, default=20,
+                        help='Maximum Vigenere key length to consider (default: 20)')
+    parser.add_argument('-j', '--jobs', type=positive_int, default=os.cpu_count(),
+                        help='Number of worker processes for multiple files (default: number of CPUs)')
     return parser.parse_args()
 
 
+def expand_files(patterns):
+    """
+    Expands files, directories (recursively) and glob patterns into a sorted list of files.
+    Exits with an error if a pattern matches no file (also for an empty directory).
+
+    >>> expand_files(["rk_c*.txt"])
+    ['rk_cdb.txt', 'rk_ceb.txt']
+    >>> expand_files(["nomatch*.zzz"])
+    Traceback (most recent call last):
+    ...
+    SystemExit: 1
+    """
+    files = []
+    for pattern in patterns:
+        matches = glob.glob(pattern, recursive=True) if glob.has_magic(pattern) else [pattern]
+        found = []
+        for match in matches:
+            if os.path.isdir(match):
+                found.extend(os.path.join(root, name) for root, _, names in os.walk(match) for name in names)
+            elif os.path.isfile(match):
+                found.append(match)
+            else:
+                print(f"{match}: No such file or directory")
+                sys.exit(1)
+        if not found:
+            print(f"{pattern}: No such file or directory")
+            sys.exit(1)
+        files.extend(found)
+    return sorted(set(files))
+
+
+def confidence(text, key):
+    """
+    Confidence of the key between 0 and 1: for every key column 1 - chi-squared value of the key letter / best
+    chi-squared value of all other letters, averaged over all columns. A column whose key letter is not the best
+    fit counts as 0.
+
+    >>> text = Caesar().encrypt(read_file("rk.txt"), "b")
+    >>> confidence(text, "b") > 0.5, confidence(text, "c")
+    (True, 0.0)
+    >>> text = Vigenere().encrypt(read_file("rk.txt"), "hugo")
+    >>> confidence(text, "hugo") > 0.5, confidence(text, "abcd")
+    (True, 0.0)
+    """
+    caesar = Caesar()
+    columns = [text[i::len(key)] for i in range(len(key))]
+    result = 0.0
+    for letter, score in zip(key.lower(), caesar.scores([caesar.histogram(column) for column in columns])):
+        shift = ord(letter) - ord('a')
+        other = min(score[:shift] + score[shift + 1:])
+        result += max(0.0, 1 - score[shift] / other) if other > 0 else 0.0
+    return result / len(key)
+
+
+def crack_file(filename, cipher, max_key_length=20):
+    """
+    Cracks one file and returns the result as dictionary (used by the worker processes).
+
+    >>> result = crack_file("rk_vehugo.txt", "v"); result["key"], result["cipher"]
+    ('hugo', 'vigenere')
+    """
+    start = time.time()
+    result = {"file": filename, "cipher": "caesar" if cipher in ['caesar', 'c'] else "vigenere"}
+    try:
+        with open(filename, 'rb') as file:
+            text = Caesar().translate(file.read(), 0)
+        kasiski = Kasiski(text)
+        if cipher in ['caesar', 'c']:
+            key = kasiski.crack_key(1, key_length=1)
+        else:
+            key = kasiski.crack_key(4, key_length=kasiski.estimate_key_length(max_key_length))
+        result["key"] = key
+        result["confidence"] = round(confidence(text, key), 4) if key else 0.0
+    except OSError as e:
+        result["error"] = str(e)
+    result["elapsed"] = round(time.time() - start, 4)
+    return result
+
+
+def crack_files(filenames, cipher, max_key_length=20, jobs=None):
+    """
+    Cracks all files in a process pool. The results are in the same order as filenames,
+    independent of which worker finishes first.
+    """
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from executor.map(crack_file, filenames, [cipher] * len(filenames),
+                                [max_key_length] * len(filenames), chunksize=max(1, len(filenames) // (4 * (jobs or 1))))
+
+
 def read_file(filename):
     try:
         with open(filename, 'r') as file:
@@ -36,19 +155,21 @@ def read_file(filename):
 
 def crack_caesar(text, verbose):
     kasiski = Kasiski(text)
-    key = kasiski.crack_key(1)  # Assuming key length 1 for Caesar
+    key = kasiski.crack_key(1, key_length=1)  # Caesar hat immer Schlüssellänge 1
     if verbose:
         print(f"Cracking Caesar-encrypted file: Key = {key}")
     else:
         print(key)
 
 
-def crack_vigenere(text, verbose):
+def crack_vigenere(text, verbose, max_key_length=20):
     kasiski = Kasiski(text)
-    # Example assumes some method to predict key length, here we use a simple placeholder
-    key_length_guess = 4  # Placeholder for actual key length determination logic
-    key = kasiski.crack_key(key_length_guess)
+    key_length = kasiski.estimate_key_length(max_key_length)  # Koinzidenzindex der Spalten
+    key = kasiski.crack_key(4, key_length=key_length)
     if verbose:
+        print(f"Friedman-Test: Schlüssellänge ~ {kasiski.friedman(Caesar().translate(text.encode(), 0)):.2f}")
+        for length, ic in kasiski.key_length_ranking(max_key_length):
+            print(f"Schlüssellänge {length:>3}: Koinzidenzindex = {ic:.4f}")
         print(f"Cracking Vigenere-encrypted file: Key = {key}")
     else:
         print(key)
@@ -56,11 +177,17 @@ def crack_vigenere(text, verbose):
 
 def main():
     args = parse_args()
-    text = read_file(args.infile)
+    filenames = expand_files(args.infile)
+    if len(filenames) > 1:
+        for result in crack_files(filenames, args.cipher, args.max_key_length, args.jobs):
+            print(json.dumps(result))
+        return
+
+    text = read_file(filenames[0])
     if args.cipher in ['caesar', 'c']:
         crack_caesar(text, args.verbose)
     elif args.cipher in ['vigenere', 'v']:
-        crack_vigenere(text, args.verbose)
+        crack_vigenere(text, args.verbose, args.max_key_length)
 
 
 if __name__ == '__main__':
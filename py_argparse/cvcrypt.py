@@ -8,12 +8,37 @@ __status__ = "Development"
 """
 
 import argparse
+import os
+import shutil
 import sys
+import tempfile
+import time
+from typing import BinaryIO, Union
 
 from py_Kasiski.Caesar.caesar import Caesar
 from py_Kasiski.Vigenere.vigenere import Vigenere
 
 
+def positive_int(value: str) -> int:
+    """
+    argparse type for integers >= 1.
+
+    >>> positive_int("4")
+    4
+    >>> positive_int("0")
+    Traceback (most recent call last):
+    ...
+    argparse.ArgumentTypeError: 0 is not a positive integer
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive integer")
+    return number
+
+
 def parse_args():
     """
     Parse command line arguments.
@@ -21,16 +46,66 @@ def parse_args():
     """
     parser = argparse.ArgumentParser(description='Encrypt and decrypt files using Caesar and Vigenere ciphers.')
     parser.add_argument('infile', type=str, help='File to encrypt or decrypt')
-    parser.add_argument('outfile', type=str, nargs='?', help='Destination file')
+    parser.add_argument('outfile', type=str, nargs='?', help='Destination file (default: infile, in place)')
     parser.add_argument('-c', '--cipher', choices=['caesar', 'c', 'vigenere', 'v'], required=True, help='Cipher to use')
     parser.add_argument('-v', '--verbose', action='store_true', help='Verbose output')
     parser.add_argument('-q', '--quiet', action='store_true', help='Quiet mode, suppress output')
     parser.add_argument('-d', '--decrypt', action='store_true', help='Decrypt the input')
     parser.add_argument('-e', '--encrypt', action='store_true', help='Encrypt the input')
     parser.add_argument('-k', '--key', type=str, required=True, help='Encryption key')
+    parser.add_argument('--chunk-size', type=positive_int, default=1024 * 1024,
+                        help='Number of bytes read and written per chunk (default: 1 MiB)')
     return parser.parse_args()
 
 
+def crypt_stream(cipher: Union[Caesar, Vigenere], infile: BinaryIO, outfile: BinaryIO, key: str,
+                 decrypt: bool = False, chunk_size: int = 1024 * 1024) -> int:
+    """
+    Encrypts or decrypts infile chunk by chunk into outfile, so only one chunk is in memory at a time.
+    For Vigenere the key phase is carried over from one chunk to the next.
+
+    >>> import io
+    >>> out = io.BytesIO()
+    >>> crypt_stream(Vigenere(), io.BytesIO(b"Hallo, wie geht es dir?"), out, "hugo", chunk_size=4)
+    23
+    >>> out.getvalue() == Vigenere().encrypt(b"Hallo, wie geht es dir?", "hugo")
+    True
+    >>> out = io.BytesIO()
+    >>> crypt_stream(Caesar(), io.BytesIO(b"ibmmp"), out, "b", decrypt=True, chunk_size=2)
+    5
+    >>> out.getvalue()
+    b'hallo'
+
+    :param cipher: Caesar or Vigenere object
+    :param infile: file opened in binary mode for reading
+    :param outfile: file opened in binary mode for writing
+    :param key: key for the cipher
+    :param decrypt: decrypt instead of encrypt
+    :param chunk_size: number of bytes per chunk
+    :return: number of bytes read
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be greater than 0")
+
+    if isinstance(cipher, Vigenere):
+        shifts = cipher.shifts(key)
+        if decrypt:
+            shifts = [-shift % 26 for shift in shifts]
+    else:
+        shift = cipher.to_key(key)
+        shifts = [-shift % 26 if decrypt else shift]
+
+    phase = 0  # Position im Schlüssel, an der der nächste Chunk beginnt
+    total = 0
+    while chunk := infile.read(chunk_size):
+        total += len(chunk)
+        crypted = cipher.shift_text(chunk, shifts[phase:] + shifts[:phase]) if isinstance(cipher, Vigenere) \
+            else cipher.translate(chunk, shifts[0])
+        phase = (phase + len(crypted)) % len(shifts)
+        outfile.write(crypted)
+    return total
+
+
 def main():
     """
     Main function.
@@ -38,20 +113,33 @@ def main():
     args = parse_args()
     cipher = Caesar() if args.cipher in ['caesar', 'c'] else Vigenere()
 
+    outfile = args.outfile or args.infile
     try:
-        with open(args.infile, 'r') as f:
-            plaintext = f.read()
-        if args.decrypt:
-            crypttext = cipher.decrypt(plaintext, args.key)
-        else:
-            crypttext = cipher.encrypt(plaintext, args.key)
-
-        with open(args.outfile, 'w') as f:
-            f.write(crypttext)
+        start = time.time()
+        with open(args.infile, 'rb') as fin:
+            # in eine temporäre Datei im Zielverzeichnis schreiben und erst am Ende ersetzen, damit infile und
+            # outfile dieselbe Datei sein dürfen
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(outfile)))
+            try:
+                with os.fdopen(fd, 'wb') as fout:
+                    total = crypt_stream(cipher, fin, fout, args.key, args.decrypt, args.chunk_size)
+                if os.path.exists(outfile):
+                    shutil.copymode(outfile, tmp)
+                else:
+                    # mkstemp legt die Datei mit 0600 an, eine neue Datei bekommt die Rechte wie bei open()
+                    umask = os.umask(0)
+                    os.umask(umask)
+                    os.chmod(tmp, 0o666 & ~umask)
+                os.replace(tmp, outfile)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        elapsed = time.time() - start
 
         if args.verbose:
             print(
-                f"{'Decrypting' if args.decrypt else 'Encrypting'} {args.cipher.title()} with key = {args.key} from file {args.infile} into file {args.outfile or args.infile}")
+                f"{'Decrypting' if args.decrypt else 'Encrypting'} {args.cipher.title()} with key = {args.key} from file {args.infile} into file {outfile}")
+            print(f"{total} bytes in {elapsed:.3f} s ({total / 1024 / 1024 / max(elapsed, 1e-9):.1f} MB/s)")
 
     except FileNotFoundError:
         print(f"{args.infile}: No such file or directory", file=sys.stderr)
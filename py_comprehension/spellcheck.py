@@ -6,9 +6,25 @@ __copyright__ = "Copyright 2024"
 __license__ = "GPL"
 __status__ = "Development"
 """
+import argparse
+import os
+import pickle
+import random
+import re
 import string
-from collections.abc import Set
-from typing import List, Tuple
+import sys
+import time
+import tracemalloc
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator, Set
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+LETTERS = "abcdefghijklmnopqrstuvwxyzäöüß"
+WORD_PATTERN = re.compile(r"[A-Za-zÄÖÜäöüß]+")
+
+# Spell checker of a worker process, set by init_worker
+worker_checker: Optional["SpellChecker"] = None
 
 
 def read_all_words(filename: str) -> Set[str]:
@@ -72,7 +88,7 @@ def edit1(word: str) -> Set[str]:
     30
     """
     try:
-        letters = "abcdefghijklmnopqrstuvwxyzäöüß"
+        letters = LETTERS
         splits = split_word(word)
         deletes = [a + b[1:] for a, b in splits if b]  # removes one letter
         transposes = [a + b[1] + b[0] + b[2:] for a, b in splits if len(b) > 1]  # swaps two adjacent letters
@@ -171,4 +187,464 @@ def correct(word: str, all_words: Set[str]) -> Set[str]:
         return {word}
     except Exception as e:
         print(f"Error: {e}")
-        return set()
\ No newline at end of file
+        return set()
+
+
+class SpellChecker:
+    """
+    Spell checker with a precomputed dictionary index.
+    The lowercase set and the lowercase to original mapping are built once instead of on every call.
+
+    >>> checker = SpellChecker({'Aalsuppe', 'Absude', 'Lupe', 'alse', 'Haus'})
+    >>> checker.correct("haus")
+    {'Haus'}
+    >>> checker.correct("Alsuppe")
+    {'Aalsuppe'}
+    >>> sorted(checker.correct("Alsupe"))
+    ['Aalsuppe', 'Absude', 'Lupe', 'alse']
+    >>> checker.correct("xyzxyzxyz")
+    {'xyzxyzxyz'}
+    """
+
+    def __init__(self, all_words: Set[str]):
+        """
+        Constructor. Builds the index.
+        :param all_words: dictionary
+        """
+        self.lower_to_original = {w.lower(): w for w in all_words}
+        # nur die wenigen Wörter, die es in mehreren Schreibweisen gibt (z.B. 'Arm' und 'arm')
+        self.ambiguous = {}
+        for w in all_words:
+            if self.lower_to_original[w.lower()] != w:
+                self.ambiguous.setdefault(w.lower(), {self.lower_to_original[w.lower()]}).add(w)
+
+    def __len__(self) -> int:
+        """
+        Number of words in the dictionary.
+
+        >>> len(SpellChecker({'Arm', 'arm', 'Bein'}))
+        3
+        """
+        return len(self.lower_to_original) + sum(len(o) - 1 for o in self.ambiguous.values())
+
+    @classmethod
+    def from_file(cls, filename: str) -> "SpellChecker":
+        """
+        Builds the spell checker from a word list (one word per line).
+        :param filename:
+        :return: SpellChecker
+
+        >>> len(SpellChecker.from_file("words.txt"))
+        3
+        """
+        return cls(read_all_words(filename))
+
+    def save(self, filename: str) -> None:
+        """
+        Saves the index with pickle, so it can be loaded without rebuilding it.
+        :param filename:
+        """
+        # nur eingebaute Typen speichern, damit die Datei nicht vom Modulnamen der Klasse abhängt
+        with open(filename, "wb") as file:
+            pickle.dump((self.lower_to_original, self.ambiguous), file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, filename: str) -> "SpellChecker":
+        """
+        Loads an index saved with save.
+        :param filename:
+        :return: SpellChecker
+
+        >>> import os, tempfile
+        >>> path = os.path.join(tempfile.mkdtemp(), "index.pickle")
+        >>> SpellChecker({'Haus', 'Maus'}).save(path)
+        >>> SpellChecker.load(path).correct("Hais")
+        {'Haus'}
+        """
+        with open(filename, "rb") as file:
+            lower_to_original, ambiguous = pickle.load(file)
+        checker = cls.__new__(cls)
+        checker.lower_to_original = lower_to_original
+        checker.ambiguous = ambiguous
+        return checker
+
+    def originals(self, valid_words: Set[str]) -> Set[str]:
+        """
+        Maps lowercase words back to all original spellings in the dictionary.
+        :param valid_words: lowercase words that are in the dictionary
+        :return: set of original words
+
+        >>> sorted(SpellChecker({'Arm', 'arm', 'Bein'}).originals({'arm', 'bein'}))
+        ['Arm', 'Bein', 'arm']
+        """
+        result = set()
+        for w in valid_words:
+            if w in self.ambiguous:
+                result.update(self.ambiguous[w])
+            else:
+                result.add(self.lower_to_original[w])
+        return result
+
+    def edit1_good(self, word: str) -> Set[str]:
+        """
+        Returns all dictionary words that are one edit away from the given word.
+        :param word:
+        :return:
+        """
+        return self.originals(self.lower_to_original.keys() & edit1(word.lower()))
+
+    def edit2_good(self, word: str) -> Set[str]:
+        """
+        Returns all dictionary words that are two edits away from the given word.
+        :param word:
+        :return:
+        """
+        possible_two_edit = set()
+        for w in edit1(word.lower()):
+            possible_two_edit.update(edit1(w))
+        return self.originals(self.lower_to_original.keys() & possible_two_edit)
+
+    def correct(self, word: str) -> Set[str]:
+        """
+        Lists all possible corrections for the given word, like the function correct.
+        :param word:
+        :return:
+        """
+        word = word.lower()
+        if word in self.lower_to_original:
+            return {self.lower_to_original[word]}
+        return self.edit1_good(word) or self.edit2_good(word) or {word}
+
+    def correct_many(self, words: Iterable[str]) -> List[Set[str]]:
+        """
+        Corrects all given words. Words that occur more than once are only corrected once.
+        :param words:
+        :return: list of corrections in the order of words
+
+        >>> SpellChecker({'Haus', 'Maus'}).correct_many(["Haus", "mais", "Haus"])
+        [{'Haus'}, {'Maus'}, {'Haus'}]
+        """
+        cache = {}
+        result = []
+        for word in words:
+            if word not in cache:
+                cache[word] = self.correct(word)
+            result.append(cache[word])
+        return result
+
+
+def deletes(word: str, distance: int = 2) -> Set[str]:
+    """
+    Returns the word and all strings that result from deleting up to distance letters.
+    :param word:
+    :param distance:
+    :return:
+
+    >>> sorted(deletes("abc"))
+    ['a', 'ab', 'abc', 'ac', 'b', 'bc', 'c']
+    >>> sorted(deletes("abc", 1))
+    ['ab', 'abc', 'ac', 'bc']
+    """
+    result = {word}
+    current = {word}
+    for _ in range(distance):
+        current = {w[:i] + w[i + 1:] for w in current for i in range(len(w))}
+        result |= current
+    return result
+
+
+def is_edit1(word: str, candidate: str) -> bool:
+    """
+    Checks whether candidate is in edit1(word) without generating edit1(word).
+    :param word:
+    :param candidate:
+    :return:
+
+    >>> is_edit1("abc", "acb"), is_edit1("abc", "abxc"), is_edit1("abc", "ab"), is_edit1("abc", "cba")
+    (True, True, True, False)
+    >>> is_edit1("abc", "ab-c")  # '-' ist kein Buchstabe und kann nicht eingefügt werden
+    False
+    """
+    if len(candidate) == len(word):
+        if candidate == word:
+            return any(c in LETTERS for c in word) or any(a == b for a, b in zip(word, word[1:]))
+        diff = [i for i in range(len(word)) if word[i] != candidate[i]]
+        if len(diff) == 1:
+            return candidate[diff[0]] in LETTERS
+        return len(diff) == 2 and diff[1] == diff[0] + 1 \
+            and word[diff[0]] == candidate[diff[1]] and word[diff[1]] == candidate[diff[0]]
+    if len(candidate) == len(word) - 1:
+        i = next((i for i in range(len(candidate)) if word[i] != candidate[i]), len(candidate))
+        return word[i + 1:] == candidate[i:]
+    if len(candidate) == len(word) + 1:
+        i = next((i for i in range(len(word)) if word[i] != candidate[i]), len(word))
+        return candidate[i] in LETTERS and candidate[i + 1:] == word[i:]
+    return False
+
+
+class SymSpellChecker(SpellChecker):
+    """
+    Spell checker with a symmetric delete index (SymSpell).
+    All strings that result from deleting up to two letters of a dictionary word are stored in a dictionary,
+    so a lookup only has to generate the deletes of the query instead of edit1 of every edit1 candidate.
+    Every candidate of the index is verified, the results are the same as with SpellChecker and correct.
+
+    >>> checker = SymSpellChecker({'Aalsuppe', 'Absude', 'Lupe', 'alse', 'Haus'})
+    >>> checker.correct("Alsuppe")
+    {'Aalsuppe'}
+    >>> sorted(checker.correct("Alsupe"))
+    ['Aalsuppe', 'Absude', 'Lupe', 'alse']
+    >>> checker.correct("Hsau")
+    {'Haus'}
+    """
+
+    def __init__(self, all_words: Set[str]):
+        """
+        Constructor. Builds the index and the delete index.
+        :param all_words: dictionary
+        """
+        super().__init__(all_words)
+        self.build_index()
+
+    def build_index(self) -> None:
+        """
+        Builds the delete index: delete variant -> list of lowercase dictionary words.
+        """
+        self.delete_index: Dict[str, List[str]] = {}
+        for w in self.lower_to_original:
+            for d in deletes(w):
+                self.delete_index.setdefault(d, []).append(w)
+
+    @classmethod
+    def load(cls, filename: str) -> "SymSpellChecker":
+        """
+        Loads an index saved with save and rebuilds the delete index.
+        :param filename:
+        :return: SymSpellChecker
+        """
+        checker = super().load(filename)
+        checker.build_index()
+        return checker
+
+    def candidates(self, word: str) -> Set[str]:
+        """
+        Returns all dictionary words (lowercase) that share a delete variant with the word.
+        :param word: lowercase word
+        :return:
+        """
+        return {w for d in deletes(word) for w in self.delete_index.get(d, ())}
+
+    def edit1_good(self, word: str) -> Set[str]:
+        """
+        Returns all dictionary words that are one edit away from the given word.
+        :param word:
+        :return:
+        """
+        word = word.lower()
+        return self.originals({c for c in self.candidates(word) if is_edit1(word, c)})
+
+    def edit2_good(self, word: str) -> Set[str]:
+        """
+        Returns all dictionary words that are two edits away from the given word.
+        :param word:
+        :return:
+        """
+        word = word.lower()
+        by_length = {}
+        for w in edit1(word):
+            by_length.setdefault(len(w), []).append(w)
+        valid_words = {c for c in self.candidates(word)
+                       if any(is_edit1(w, c) for n in (len(c) - 1, len(c), len(c) + 1) for w in by_length.get(n, ()))}
+        return self.originals(valid_words)
+
+
+def init_worker(checker: SpellChecker) -> None:
+    """
+    Initializer of the worker processes. With fork the index is inherited and not copied.
+    :param checker:
+    """
+    global worker_checker
+    worker_checker = checker
+
+
+def correct_word(word: str) -> str:
+    """
+    Corrects one word in a worker process. The word is kept if it is correct or unknown,
+    otherwise the alphabetically first correction is used.
+    :param word:
+    :return: corrected word
+    """
+    corrections = worker_checker.correct(word)
+    if word.lower() in {c.lower() for c in corrections}:
+        return word
+    return sorted(corrections)[0]
+
+
+def correct_stream(lines: Iterable[str], checker: SpellChecker, jobs: Optional[int] = None,
+                   cache_size: int = 100000, block_lines: int = 10000) -> Iterator[str]:
+    """
+    Corrects a stream of lines block by block. The unique new words of a block are corrected in a process pool,
+    the corrections are kept in an LRU cache so repeated words are only corrected once.
+
+    >>> list(correct_stream(["Das Hais ist grn.", "Hais!"], SpellChecker({'Haus', 'grün', 'Das', 'ist'}), jobs=1))
+    ['Das Haus ist grün.', 'Haus!']
+
+    :param lines: lines of text
+    :param checker: SpellChecker or SymSpellChecker
+    :param jobs: number of worker processes
+    :param cache_size: maximum number of cached corrections
+    :param block_lines: number of lines per block
+    :return: corrected lines
+    """
+    if (jobs is not None and jobs < 1) or cache_size < 1 or block_lines < 1:
+        raise ValueError("jobs, cache_size and block_lines must be greater than 0")
+    cache = OrderedDict()
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(checker,)) as executor:
+        block = []
+        for line in lines:
+            block.append(line)
+            if len(block) >= block_lines:
+                yield from correct_block(block, executor, cache, cache_size, jobs)
+                block = []
+        yield from correct_block(block, executor, cache, cache_size, jobs)
+
+
+def correct_block(block: List[str], executor: ProcessPoolExecutor, cache: OrderedDict, cache_size: int,
+                  jobs: Optional[int] = None) -> List[str]:
+    """
+    Corrects one block of lines, see correct_stream.
+    :return: corrected lines
+    """
+    words = {m.group() for line in block for m in WORD_PATTERN.finditer(line)}
+    for word in words & cache.keys():
+        cache.move_to_end(word)
+    new_words = sorted(words - cache.keys())
+    chunksize = max(1, len(new_words) // ((jobs or os.cpu_count() or 1) * 4))
+    for word, corrected in zip(new_words, executor.map(correct_word, new_words, chunksize=chunksize)):
+        cache[word] = corrected
+    mapping = {word: cache[word] for word in words}
+    while len(cache) > cache_size:
+        cache.popitem(last=False)
+    return [WORD_PATTERN.sub(lambda m: mapping[m.group()], line) for line in block]
+
+
+def benchmark(dictionary: str) -> None:
+    """
+    Benchmark: 100 000 Wörter gegen das Wörterbuch korrigieren, Speicher und Latenz des SymSpell-Index.
+    :param dictionary: word list, e.g. de-en.txt
+    """
+    words = read_all_words(dictionary)
+    if not words:
+        return
+
+    start = time.time()
+    checker = SpellChecker(words)
+    print(f"Index aufgebaut: {len(words)} Wörter in {time.time() - start:.3f} s")
+
+    checker.save(dictionary + ".pickle")
+    start = time.time()
+    checker = SpellChecker.load(dictionary + ".pickle")
+    print(f"Index geladen in {time.time() - start:.3f} s")
+
+    # Mischung aus korrekten Wörtern und Wörtern mit einem Tippfehler
+    sample = random.Random(42).choices(sorted(words), k=100000)
+    queries = [w if i % 2 else w[:-1] for i, w in enumerate(sample)]
+
+    start = time.time()
+    checker.correct_many(queries)
+    print(f"100 000 Wörter mit SpellChecker korrigiert in {time.time() - start:.3f} s")
+
+    start = time.time()
+    for w in queries[:100]:
+        correct(w, words)
+    print(f"100 Wörter mit correct korrigiert in {time.time() - start:.3f} s")
+
+    # Speicher und Latenz: SymSpell-Index gegen edit2 über edit1
+    tracemalloc.start()
+    start = time.time()
+    symspell = SymSpellChecker(words)
+    build_time = time.time() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"SymSpell-Index: {len(symspell.delete_index)} Einträge, {memory / 1024 / 1024:.0f} MB, "
+          f"aufgebaut in {build_time:.3f} s")
+
+    # Wörter mit zwei Tippfehlern, damit edit2 gebraucht wird
+    queries2 = [w[1:-1] for w in sample[:200] if len(w) > 4]
+    for name, c in [("SpellChecker", checker), ("SymSpellChecker", symspell)]:
+        start = time.time()
+        for w in queries2:
+            c.correct(w)
+        print(f"{name}: {(time.time() - start) / len(queries2) * 1000:.2f} ms pro Wort mit zwei Fehlern")
+
+
+def positive_int(value: str) -> int:
+    """
+    argparse type for integers >= 1.
+
+    >>> positive_int("4")
+    4
+    >>> positive_int("0")
+    Traceback (most recent call last):
+    ...
+    argparse.ArgumentTypeError: 0 is not a positive integer
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive integer")
+    return number
+
+
+def parse_args():
+    """
+    Parse command line arguments.
+    :return: Parsed arguments
+    """
+    parser = argparse.ArgumentParser(description='Correct the spelling of a text file.')
+    parser.add_argument('infile', type=str, nargs='?', default='-', help='Text file to correct (default: stdin)')
+    parser.add_argument('outfile', type=str, nargs='?', help='Destination file (default: stdout)')
+    parser.add_argument('-d', '--dictionary', type=str, default='de-en.txt',
+                        help='Word list, or an index saved with SpellChecker.save (*.pickle)')
+    parser.add_argument('-s', '--symspell', action='store_true', help='Use the symmetric delete index')
+    parser.add_argument('-j', '--jobs', type=positive_int, default=os.cpu_count(), help='Number of worker processes')
+    parser.add_argument('--cache-size', type=positive_int, default=100000, help='Number of cached corrections')
+    parser.add_argument('--block-lines', type=positive_int, default=10000,
+                        help='Number of lines corrected per block')
+    parser.add_argument('--benchmark', action='store_true', help='Run the benchmark against the dictionary and exit')
+    return parser.parse_args()
+
+
+def main():
+    """
+    Main function.
+    """
+    args = parse_args()
+    if args.benchmark:
+        benchmark(args.dictionary)
+        return
+
+    cls = SymSpellChecker if args.symspell else SpellChecker
+    if args.dictionary.endswith('.pickle'):
+        checker = cls.load(args.dictionary)
+    elif os.path.exists(args.dictionary):
+        checker = cls.from_file(args.dictionary)
+    else:
+        print(f"{args.dictionary}: No such file or directory", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        infile = sys.stdin if args.infile == '-' else open(args.infile)
+    except FileNotFoundError:
+        print(f"{args.infile}: No such file or directory", file=sys.stderr)
+        sys.exit(1)
+    outfile = open(args.outfile, 'w') if args.outfile else sys.stdout
+    with infile, outfile:
+        for line in correct_stream(infile, checker, args.jobs, args.cache_size, args.block_lines):
+            outfile.write(line)
+
+
+if __name__ == "__main__":
+    main()
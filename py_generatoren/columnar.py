@@ -0,0 +1,242 @@
+"""
+__author__ = "Filip Ilic"
+__email__ = "filip.ilic@htl.rennweg.at"
+__version__ = "1.0.0"
+__copyright__ = "Copyright 2024"
+__license__ = "GPL"
+__status__ = "Development"
+"""
+
+import json
+import os
+from array import array
+from collections import Counter
+from typing import Dict, Generator, Iterable, List, Optional, Sequence, Tuple
+
+from py_generatoren.logfiles import LogRecord, parse_timestamp
+
+try:
+    import numpy as np
+except ImportError:  # numpy ist optional, ohne numpy werden die Spalten als array.array gelesen
+    np = None
+
+# Anzahl Zeilen pro Batch
+BATCH_SIZE = 64 * 1024
+
+# Spalte -> Typecode von array.array (= numpy dtype), Strings werden als Index in ein Wörterbuch gespeichert
+COLUMNS = {"time": "q", "ip": "I", "method": "I", "url": "I", "status": "H", "bytes": "q",
+           "referrer": "I", "user_agent": "I"}
+STRING_COLUMNS = ("ip", "method", "url", "referrer", "user_agent")
+
+
+class ColumnarWriter:
+    """
+    Sink stage: collects LogRecords in batches of batch_size rows and appends every batch to one binary file per
+    column (native byte order, can be read with numpy.fromfile or array.frombytes). Strings are dictionary-encoded,
+    the dictionaries are stored in dictionary.json. Writing into an existing directory appends to it.
+    Records with a malformed timestamp are skipped and counted in skipped.
+
+    >>> import tempfile
+    >>> from py_generatoren.logfiles import parse_lines
+    >>> directory = tempfile.mkdtemp()
+    >>> with ColumnarWriter(directory, batch_size=2) as writer:
+    ...     for record in parse_lines(['1.2.3.4 - - [24/Jan/2016:07:19:28 +0100] "GET / HTTP/1.1" 200 100',
+    ...                                '5.6.7.8 - - [24/Jan/2016:07:19:29 +0100] "GET /a HTTP/1.1" 404 20',
+    ...                                '1.2.3.4 - - [24/Foo/2016:07:19:30 +0100] "GET / HTTP/1.1" 200 1',
+    ...                                '1.2.3.4 - - [24/Jan/2016:07:19:30 +0100] "POST / HTTP/1.1" 200 5 "/a" "curl"']):
+    ...         writer.add(record)
+    >>> writer.rows, writer.skipped
+    (3, 1)
+    >>> batch = next(read_columnar(directory, ["ip", "bytes", "user_agent"]))
+    >>> list(batch["ip"]), list(batch["bytes"]), list(batch["user_agent"])
+    ([0, 1, 0], [100, 20, 5], [0, 0, 1])
+    >>> load_dictionaries(directory)["user_agent"]
+    ['-', 'curl']
+    >>> count_requests_columnar(directory)
+    ('1.2.3.4', '/', 125)
+    """
+
+    def __init__(self, directory: str, batch_size: int = BATCH_SIZE):
+        """
+        Constructor.
+        :param directory: directory for the column files
+        :param batch_size: number of rows per batch
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.batch_size = batch_size
+        self.dictionaries = {name: {value: code for code, value in enumerate(values)}
+                             for name, values in load_dictionaries(directory).items()}
+        self.columns = {name: array(typecode) for name, typecode in COLUMNS.items()}
+        self.rows = 0
+        self.skipped = 0
+
+    def encode(self, column: str, value: str) -> int:
+        dictionary = self.dictionaries[column]
+        code = dictionary.get(value)
+        if code is None:
+            code = dictionary[value] = len(dictionary)
+        return code
+
+    def add(self, record: LogRecord) -> None:
+        """
+        Appends one record, writes a batch when it is full.
+        :param record:
+        """
+        try:
+            seconds = parse_timestamp(record.timestamp)
+        except ValueError:
+            self.skipped += 1  # malformed timestamp, the record is skipped
+            return
+        columns = self.columns
+        columns["time"].append(seconds)
+        columns["ip"].append(self.encode("ip", record.ip))
+        columns["method"].append(self.encode("method", record.method))
+        columns["url"].append(self.encode("url", record.url))
+        columns["status"].append(record.status)
+        columns["bytes"].append(record.bytes)
+        columns["referrer"].append(self.encode("referrer", record.referrer))
+        columns["user_agent"].append(self.encode("user_agent", record.user_agent))
+        if len(columns["time"]) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes the collected rows and the dictionaries.
+        """
+        for name, column in self.columns.items():
+            with open(os.path.join(self.directory, name + ".col"), "ab") as f:
+                column.tofile(f)
+        self.rows += len(self.columns["time"])
+        self.columns = {name: array(typecode) for name, typecode in COLUMNS.items()}
+        dictionaries = {name: list(dictionary) for name, dictionary in self.dictionaries.items()}
+        with open(os.path.join(self.directory, "dictionary.json.tmp"), "w") as f:
+            json.dump(dictionaries, f)
+        os.replace(os.path.join(self.directory, "dictionary.json.tmp"), os.path.join(self.directory, "dictionary.json"))
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> "ColumnarWriter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def write_columnar(records: Iterable[LogRecord], directory: str, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Writes all records with a ColumnarWriter.
+
+    :param records: Iterable of LogRecords, e.g. from parse_lines
+    :param directory: directory for the column files
+    :param batch_size: number of rows per batch
+    :return: number of rows written
+    """
+    with ColumnarWriter(directory, batch_size) as writer:
+        for record in records:
+            writer.add(record)
+    return writer.rows
+
+
+def load_dictionaries(directory: str) -> Dict[str, List[str]]:
+    """
+    The dictionaries of the string columns: code -> string.
+    """
+    try:
+        with open(os.path.join(directory, "dictionary.json")) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {name: [] for name in STRING_COLUMNS}
+
+
+def read_columnar(directory: str, columns: Optional[Sequence[str]] = None,
+                  batch_size: int = BATCH_SIZE) -> Generator[Dict[str, Sequence[int]], None, None]:
+    """
+    Generator function yielding batches of columns {column: values}. Only the requested columns are read.
+    The values are numpy arrays if numpy is installed, otherwise array.array. String columns contain the codes,
+    see load_dictionaries.
+
+    :param directory: directory with the column files
+    :param columns: names of the columns, default all
+    :param batch_size: number of rows per batch
+    :return: Generator yielding batches
+    """
+    files = {name: open(os.path.join(directory, name + ".col"), "rb") for name in columns or COLUMNS}
+    try:
+        while True:
+            batch = {}
+            for name, f in files.items():
+                if np is not None:
+                    batch[name] = np.fromfile(f, dtype=COLUMNS[name], count=batch_size)
+                else:
+                    batch[name] = array(COLUMNS[name], f.read(batch_size * array(COLUMNS[name]).itemsize))
+            if not len(next(iter(batch.values()))):
+                return
+            yield batch
+    finally:
+        for f in files.values():
+            f.close()
+
+
+def count_column(directory: str, column: str) -> Counter:
+    """
+    Number of rows per code of a string column.
+
+    :param directory: directory with the column files
+    :param column: name of a string column
+    :return: Counter code -> number of rows
+    """
+    counter = Counter()
+    for batch in read_columnar(directory, [column]):
+        if np is not None:
+            counts = np.bincount(batch[column])
+            counter.update({int(code): int(counts[code]) for code in np.flatnonzero(counts)})
+        else:
+            counter.update(batch[column])
+    return counter
+
+
+def count_requests_columnar(directory: str) -> Tuple[str, str, int]:
+    """
+    Same result as count_requests over the original log lines, but scans only the ip, url and bytes columns.
+
+    :param directory: directory with the column files
+    :return: Tuple containing (most active IP, most requested URL, total bytes)
+    """
+    dictionaries = load_dictionaries(directory)
+    total_bytes = 0
+    for batch in read_columnar(directory, ["bytes"]):
+        total_bytes += int(batch["bytes"].sum()) if np is not None else sum(batch["bytes"])
+    ip_code = count_column(directory, "ip").most_common(1)[0][0]
+    url_code = count_column(directory, "url").most_common(1)[0][0]
+    return dictionaries["ip"][ip_code], dictionaries["url"][url_code], total_bytes
+
+
+if __name__ == "__main__":
+    import doctest
+    import shutil
+    import tempfile
+    import time
+    from py_generatoren.logfiles import count_requests, extract_fields, parse_lines
+
+    doctest.testmod()
+
+    # Benchmark: access.log 50 Mal, Abfrage über den Text gegen die Spalten
+    with open("logs/access.log") as f:
+        log_lines = [line.rstrip() for line in f] * 50
+    directory = tempfile.mkdtemp()
+    try:
+        start = time.perf_counter()
+        rows = write_columnar(parse_lines(log_lines), directory)
+        print(f"  schreiben: {rows} Zeilen in {time.perf_counter() - start:.2f} s, "
+              f"{sum(os.path.getsize(os.path.join(directory, fn)) for fn in os.listdir(directory)) / 1e6:.1f} MB "
+              f"statt {sum(len(line) + 1 for line in log_lines) / 1e6:.1f} MB")
+
+        for name, query in [("Text", lambda: count_requests(extract_fields(log_lines))),
+                            ("Spalten", lambda: count_requests_columnar(directory))]:
+            start = time.perf_counter()
+            result = query()
+            print(f"{name:>11}: {result} in {time.perf_counter() - start:.3f} s")
+    finally:
+        shutil.rmtree(directory)
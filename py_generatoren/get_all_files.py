@@ -7,9 +7,27 @@ __license__ = "GPL"
 __status__ = "Development"
 """
 
+import bz2
+import fnmatch
+import gzip
+import lzma
+import mmap
 import os
-from collections.abc import Iterable, Generator
-from typing import TextIO
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from collections.abc import Iterable, Generator, Iterator
+from typing import Callable, List, Optional, Sequence, TextIO, Tuple, Union
+
+# Größe des Fensters, das read_lines_mmap auf einmal einblendet
+MMAP_WINDOW = 16 * 1024 * 1024
+
+# Magic bytes am Dateianfang -> Funktion zum Öffnen der komprimierten Datei
+COMPRESSION_MAGIC = {
+    b"\x1f\x8b": gzip.open,
+    b"BZh": bz2.open,
+    b"\xfd7zXZ\x00": lzma.open,
+}
 
 
 def get_all_files(path: os.PathLike | str):
@@ -39,15 +57,198 @@ def get_all_files(path: os.PathLike | str):
         pass
 
 
-def open_files(filenames: Iterable[str]) -> Generator[TextIO, None, None]:
+def matches(name: str, patterns: Optional[Sequence[str]]) -> bool:
+    """
+    True if name matches one of the glob patterns.
+
+    >>> matches("access.log.gz", ["*.log", "*.gz"]), matches("README", ["*.log"])
+    (True, False)
+    """
+    return any(fnmatch.fnmatch(name, pattern) for pattern in patterns or ())
+
+
+def scan_directory(path: str, include: Optional[Sequence[str]], exclude: Optional[Sequence[str]],
+                   with_stat: bool) -> Tuple[List, List[str]]:
+    """
+    Scan one directory with os.scandir (runs in a worker thread of walk_files).
+    The file type comes from the cached DirEntry information. Symlinks to directories are skipped, so the walk
+    cannot run into a loop. With with_stat, entries that cannot be stat'ed (e.g. broken symlinks) are skipped.
+
+    :return: (files, subdirectories)
+    """
+    files, directories = [], []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                if exclude and matches(entry.name, exclude):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    directories.append(entry.path)
+                elif entry.is_symlink() and entry.is_dir():
+                    continue  # Symlink auf ein Verzeichnis
+                elif include is None or matches(entry.name, include):
+                    if with_stat:
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue  # z.B. Symlink ohne Ziel, nur dieser Eintrag fehlt
+                        files.append((entry.path, stat.st_size, stat.st_mtime))
+                    else:
+                        files.append(entry.path)
+    except PermissionError:
+        print("Permission denied for " + path)
+    except FileNotFoundError:
+        print("File not found: " + path)
+    except OSError as e:
+        print("An error occurred: " + str(e))
+    return files, directories
+
+
+def walk_files(path: os.PathLike | str, include: Optional[Sequence[str]] = None,
+               exclude: Optional[Sequence[str]] = None, max_depth: Optional[int] = None, with_stat: bool = False,
+               jobs: int = 8) -> Generator[Union[str, Tuple[str, int, float]], None, None]:
+    """
+    Generator function like get_all_files, but built on os.scandir: the file type is taken from the DirEntry
+    instead of an extra stat per entry, and subdirectories are scanned concurrently in a thread pool.
+    The order of the files is therefore not fixed. Symlinks to directories are neither followed nor yielded.
+
+    :param path: path to the directory
+    :param include: glob patterns for file names, only matching files are yielded (default: all files)
+    :param exclude: glob patterns for file and directory names to skip, excluded directories are not entered
+    :param max_depth: maximum depth of subdirectories, 0 = only the files in path (default: unlimited)
+    :param with_stat: yield (path, size, mtime) instead of path. Windows takes the values from the directory
+        listing, on POSIX systems it costs one stat per file in the worker threads. Files that cannot be
+        stat'ed, like broken symlinks, are skipped
+    :param jobs: number of threads
+    :return: Generator yielding files
+
+    >>> import tempfile
+    >>> root = tempfile.mkdtemp()
+    >>> for name in ["a.log", "b.txt", "sub/c.log", "sub/deep/d.log", ".git/e.log"]:
+    ...     os.makedirs(os.path.dirname(os.path.join(root, name)), exist_ok=True)
+    ...     with open(os.path.join(root, name), "w") as f:
+    ...         _ = f.write("x" * len(name))
+    >>> sorted(os.path.relpath(fn, root) for fn in walk_files(root, include=["*.log"], exclude=[".git"]))
+    ['a.log', 'sub/c.log', 'sub/deep/d.log']
+    >>> sorted(os.path.relpath(fn, root) for fn in walk_files(root, max_depth=1, exclude=[".*"]))
+    ['a.log', 'b.txt', 'sub/c.log']
+    >>> [(os.path.basename(fn), size) for fn, size, mtime in walk_files(root, include=["a.*"], with_stat=True)]
+    [('a.log', 5)]
+    >>> os.symlink(os.path.join(root, "missing.log"), os.path.join(root, "broken.log"))
+    >>> os.symlink(os.path.join(root, "sub"), os.path.join(root, "loop"))
+    >>> sorted(os.path.relpath(fn, root) for fn, size, mtime in walk_files(root, exclude=[".git"], with_stat=True))
+    ['a.log', 'b.txt', 'sub/c.log', 'sub/deep/d.log']
+    """
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        pending = {executor.submit(scan_directory, os.fspath(path), include, exclude, with_stat): 0}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                depth = pending.pop(future)
+                files, directories = future.result()
+                if max_depth is None or depth < max_depth:
+                    for directory in directories:
+                        pending[executor.submit(scan_directory, directory, include, exclude, with_stat)] = depth + 1
+                yield from files
+
+
+def detect_compression(filename: str) -> Optional[Callable]:
+    """
+    Detect gzip, bz2 or xz compression by the magic bytes at the start of the file.
+
+    :param filename: name of the file
+    :return: function to open the file (gzip.open, bz2.open, lzma.open) or None for plain files
+
+    >>> detect_compression("logs/access.log") is None
+    True
+    """
+    with open(filename, "rb") as f:
+        start = f.read(6)
+    for magic, opener in COMPRESSION_MAGIC.items():
+        if start.startswith(magic):
+            return opener
+    return None
+
+
+class BackgroundReader:
+    """
+    Reads the lines of a compressed file in a background thread and hands them over in batches through a
+    bounded queue, so decompression overlaps with the processing of the lines.
+    Can be iterated like a file handle.
+
+    >>> import tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), "test.log.gz")
+    >>> with gzip.open(path, "wt") as f:
+    ...     _ = f.write("a\\nb\\n")
+    >>> with BackgroundReader(path, gzip.open) as reader:
+    ...     list(reader)
+    ['a\\n', 'b\\n']
+    """
+
+    def __init__(self, filename: str, opener: Callable, batch_size: int = 1024 * 1024, max_batches: int = 8):
+        """
+        Constructor. Starts the background thread.
+        :param filename: name of the file
+        :param opener: gzip.open, bz2.open or lzma.open
+        :param batch_size: approximate number of bytes per batch
+        :param max_batches: maximum number of batches waiting in the queue
+        """
+        self.name = filename
+        self._queue = queue.Queue(maxsize=max_batches)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._produce, args=(filename, opener, batch_size), daemon=True)
+        self._thread.start()
+
+    def _produce(self, filename: str, opener: Callable, batch_size: int) -> None:
+        try:
+            with opener(filename, "rt") as f:
+                while not self._stop.is_set():
+                    batch = f.readlines(batch_size)
+                    if not batch:
+                        break
+                    self._queue.put(batch)
+            self._queue.put(None)
+        except Exception as e:
+            self._queue.put(e)
+
+    def __iter__(self) -> Iterator[str]:
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                return
+            if isinstance(batch, Exception):
+                raise batch
+            yield from batch
+
+    def close(self) -> None:
+        """
+        Stop the background thread.
+        """
+        self._stop.set()
+        while self._thread.is_alive():
+            try:
+                self._queue.get_nowait()  # Platz machen, falls der Thread auf die Queue wartet
+            except queue.Empty:
+                self._thread.join(0.01)
+
+    def __enter__(self) -> "BackgroundReader":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def open_files(filenames: Iterable[str]) -> Generator[Union[TextIO, BackgroundReader], None, None]:
     """
     Generator function to open files and yield file handles.
+    Files compressed with gzip, bz2 or xz are decompressed in a background thread.
 
     :param filenames: Iterable of filenames
     :return: Generator yielding file handles
     """
     for fn in filenames:
-        with open(fn) as f:
+        opener = detect_compression(fn)
+        with (BackgroundReader(fn, opener) if opener else open(fn)) as f:
             yield f
 
 
@@ -63,6 +264,83 @@ def read_lines(files: Iterable[TextIO]) -> Generator[str, None, None]:
             yield line.rstrip()
 
 
+def read_lines_mmap(filenames: Iterable[str], memoryviews: bool = False, decode: bool = False,
+                    window: int = MMAP_WINDOW) -> Generator[Union[bytes, memoryview, str], None, None]:
+    """
+    Generator function like read_lines(open_files(filenames)), but the files are memory-mapped in windows of
+    window bytes and the lines are yielded as bytes without line ending, so nothing is decoded that is not needed.
+    With memoryviews=True the lines are memoryview slices of the mapping and nothing is copied at all; a slice that
+    is kept alive also keeps its window mapped. Compressed files are decompressed line by line instead.
+
+    :param filenames: Iterable of filenames
+    :param memoryviews: yield memoryview slices instead of bytes
+    :param decode: yield str like read_lines (decoded per line, trailing whitespace stripped like read_lines;
+        bytes and memoryviews only lose the line ending)
+    :param window: number of bytes mapped at once, at least the length of the longest line
+    :return: Generator yielding lines
+
+    >>> import tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), "test.log")
+    >>> with open(path, "wb") as f:
+    ...     _ = f.write(b"erste Zeile\\r\\nzweite \\t\\n\\nletzte ohne Zeilenende")
+    >>> list(read_lines_mmap([path], window=16))
+    [b'erste Zeile', b'zweite \\t', b'', b'letzte ohne Zeilenende']
+    >>> list(read_lines_mmap([path], decode=True))
+    ['erste Zeile', 'zweite', '', 'letzte ohne Zeilenende']
+    >>> [bytes(line) for line in read_lines_mmap([path], memoryviews=True)] == list(read_lines_mmap([path]))
+    True
+    >>> list(read_lines_mmap([path], decode=True)) == list(read_lines(open_files([path])))
+    True
+    """
+    for fn in filenames:
+        opener = detect_compression(fn)
+        if opener:
+            with opener(fn, "rb") as f:
+                for line in f:
+                    line = line.rstrip(b"\r\n")
+                    yield line.decode().rstrip() if decode else memoryview(line) if memoryviews else line
+            continue
+
+        with open(fn, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            offset = 0
+            length = window
+            while offset < size:
+                # mmap braucht einen Offset, der ein Vielfaches von ALLOCATIONGRANULARITY ist
+                aligned = offset - offset % mmap.ALLOCATIONGRANULARITY
+                pos = offset - aligned
+                mm = mmap.mmap(f.fileno(), min(pos + length, size - aligned), access=mmap.ACCESS_READ,
+                               offset=aligned)
+                # nur vollständige Zeilen, der Rest kommt ins nächste Fenster
+                end = len(mm) if aligned + len(mm) == size else mm.rfind(b"\n", pos) + 1
+                if end <= pos:
+                    mm.close()
+                    length *= 2  # Zeile länger als das Fenster
+                    continue
+                if memoryviews:
+                    view = memoryview(mm)
+                    while pos < end:
+                        newline = mm.find(b"\n", pos, end)
+                        next_pos = end if newline == -1 else newline + 1
+                        stop = next_pos - 1 if newline != -1 else end
+                        if stop > pos and mm[stop - 1] == 13:  # \r
+                            stop -= 1
+                        yield view[pos:stop]
+                        pos = next_pos
+                    view.release()
+                else:
+                    mm.seek(pos)
+                    readline = mm.readline
+                    while mm.tell() < end:
+                        line = readline().rstrip(b"\r\n")
+                        yield line.decode().rstrip() if decode else line
+                offset = aligned + end
+                try:
+                    mm.close()
+                except BufferError:
+                    pass  # es gibt noch memoryviews auf das Fenster, es wird freigegeben, wenn sie weg sind
+
+
 def print_lines(lines: Iterable[str]) -> None:
     """
     Function to print lines, stripping trailing whitespace.
@@ -73,7 +351,140 @@ def print_lines(lines: Iterable[str]) -> None:
         print(line)
 
 
+def benchmark_compression(size_mb: int = 2048, sample: str = "logs/access.log") -> None:
+    """
+    Benchmark: read_lines over a plain and a gzip/bz2/xz compressed corpus of about size_mb MB,
+    built by repeating the sample log file. Prints the throughput in MB/s of uncompressed data.
+
+    :param size_mb: size of the uncompressed corpus in MB
+    :param sample: log file that is repeated
+    """
+    import shutil
+    import tempfile
+    import time
+
+    directory = tempfile.mkdtemp()
+    try:
+        with open(sample, "rb") as f:
+            data = f.read()
+        plain = os.path.join(directory, "access.log")
+        with open(plain, "wb") as f:
+            for _ in range(size_mb * 1024 * 1024 // len(data) + 1):
+                f.write(data)
+        size = os.path.getsize(plain) / 1024 / 1024
+
+        files = {"plain": plain}
+        for name, opener in [("gzip", gzip.open), ("bz2", bz2.open), ("xz", lzma.open)]:
+            files[name] = os.path.join(directory, "access.log." + name)
+            with open(plain, "rb") as fin, opener(files[name], "wb") as fout:
+                shutil.copyfileobj(fin, fout, 16 * 1024 * 1024)
+
+        for name, fn in files.items():
+            start = time.time()
+            count = sum(1 for _ in read_lines(open_files([fn])))
+            elapsed = time.time() - start
+            print(f"{name:>5}: {count} Zeilen, {size:.0f} MB in {elapsed:.2f} s ({size / elapsed:.1f} MB/s)")
+    finally:
+        shutil.rmtree(directory)
+
+
+def benchmark_walk(count: int = 1_000_000, per_directory: int = 1000) -> None:
+    """
+    Benchmark: get_all_files against walk_files on a synthetic tree with count empty files,
+    per_directory files per directory in a two-level tree.
+
+    :param count: number of files
+    :param per_directory: number of files per directory
+    """
+    import shutil
+    import tempfile
+    import time
+
+    root = tempfile.mkdtemp()
+    try:
+        for i in range(0, count, per_directory):
+            directory = os.path.join(root, f"{i // per_directory // 100:03d}", f"{i // per_directory % 100:02d}")
+            os.makedirs(directory)
+            for j in range(min(per_directory, count - i)):
+                open(os.path.join(directory, f"{j}.log"), "w").close()
+
+        for name, walker in [("get_all_files", lambda: get_all_files(root)),
+                             ("walk_files 1", lambda: walk_files(root, jobs=1)),
+                             ("walk_files 8", lambda: walk_files(root, jobs=8)),
+                             ("with_stat 8", lambda: walk_files(root, with_stat=True, jobs=8))]:
+            start = time.time()
+            found = sum(1 for _ in walker())
+            elapsed = time.time() - start
+            print(f"{name:>13}: {found} Dateien in {elapsed:.2f} s ({found / elapsed:.0f} Dateien/s)")
+    finally:
+        shutil.rmtree(root)
+
+
+def measure_reader(reader: str, filename: str) -> Tuple[int, float, int]:
+    """
+    Reads all lines of filename with one reader (runs in a fresh process for benchmark_readers).
+
+    :return: (number of lines, seconds, peak RSS in KB)
+    """
+    import resource
+    import time
+
+    readers = {
+        "read_lines": lambda: read_lines(open_files([filename])),
+        "mmap bytes": lambda: read_lines_mmap([filename]),
+        "mmap memoryview": lambda: read_lines_mmap([filename], memoryviews=True),
+        "mmap decode": lambda: read_lines_mmap([filename], decode=True),
+    }
+    start = time.time()
+    count = sum(1 for _ in readers[reader]())
+    return count, time.time() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def benchmark_readers(size_mb: int = 1024, sample: str = "logs/access.log") -> None:
+    """
+    Benchmark: read_lines against read_lines_mmap on a corpus of about size_mb MB. Every reader runs in a fresh
+    process, so the peak RSS belongs to that reader alone.
+
+    :param size_mb: size of the corpus in MB
+    :param sample: log file that is repeated
+    """
+    import multiprocessing
+    import shutil
+    import tempfile
+    from concurrent.futures import ProcessPoolExecutor
+
+    directory = tempfile.mkdtemp()
+    try:
+        with open(sample, "rb") as f:
+            data = f.read()
+        plain = os.path.join(directory, "access.log")
+        with open(plain, "wb") as f:
+            for _ in range(size_mb * 1024 * 1024 // len(data) + 1):
+                f.write(data)
+        size = os.path.getsize(plain) / 1024 / 1024
+
+        for reader in ["read_lines", "mmap bytes", "mmap memoryview", "mmap decode"]:
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                count, elapsed, rss = executor.submit(measure_reader, reader, plain).result()
+            print(f"{reader:>15}: {count} Zeilen in {elapsed:.2f} s ({size / elapsed:.0f} MB/s), "
+                  f"Peak RSS {rss / 1024:.0f} MB")
+    finally:
+        shutil.rmtree(directory)
+
+
 if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "benchmark":
+        benchmark_compression(int(sys.argv[2]) if len(sys.argv) > 2 else 2048)
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == "mmap":
+        benchmark_readers(int(sys.argv[2]) if len(sys.argv) > 2 else 1024)
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == "walk":
+        benchmark_walk(int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000)
+        sys.exit(0)
+
     directory_path = "/home/filip-ilic/Dokumente/Developer/Oracle/Oracle_XE"
     for file in get_all_files(directory_path):
         print(file)
@@ -9,15 +9,115 @@ __status__ = "Development"
 
 import os
 import gzip
-from typing import Generator, Iterable, TextIO, List, Tuple, Dict
+import calendar
+import json
+import re
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Generator, Iterable, TextIO, List, Tuple, Dict, Optional, NamedTuple, Callable
 from collections import defaultdict, Counter
 from py_generatoren.get_all_files import *
+from py_generatoren.sketches import CountMinSketch, HyperLogLog, SpaceSaving, hash64
+
+# Standardgröße eines Shards für die parallele Auswertung
+SHARD_SIZE = 64 * 1024 * 1024
+
+# Anzahl Bytes am Dateianfang, an denen der Checkpoint eine Datei wiedererkennt
+FINGERPRINT_SIZE = 1024
+
+# Apache combined log format, Referrer und User-Agent sind optional (common log format)
+LOG_PATTERN = re.compile(r'(\S+) \S+ \S+ \[([^\]]*)\] "([^"]*)" (\d{3}) (\d+|-)(?: "([^"]*)" "([^"]*)")?')
+
+# schneller Weg: vollständige Zeile im combined log format mit Methode und URL, nur einfache Zeichenklassen,
+# damit der Regex-Automat nicht zurücksetzen muss; alles andere geht über LOG_PATTERN
+COMBINED_PATTERN = re.compile(
+    r'([^ ]*) [^ ]* [^ ]* \[([^]]*)\] "([^ "]*) ([^ "]*) [^"]*" ([0-9]{3}) ([0-9]+) "([^"]*)" "(.*)"$')
+
+# Monatsnamen im Zeitstempel ("24/Jan/2016:07:19:28 +0100") -> Monatsnummer
+MONTHS = {"Jan": 1, "Feb": 2, "Mar": 3, "Apr": 4, "May": 5, "Jun": 6,
+          "Jul": 7, "Aug": 8, "Sep": 9, "Oct": 10, "Nov": 11, "Dec": 12}
+
+# baut einen LogRecord direkt aus einem fertigen Tupel, ohne den in Python erzeugten __new__ von NamedTuple
+_new_record = tuple.__new__
+
+
+class LogRecord(NamedTuple):
+    """
+    One parsed line of an access log. A tuple, so parse_line builds it straight from the regex groups.
+
+    >>> LogRecord("127.0.0.1", "24/May/2024:14:00:00 +0000", "GET", "/", 200, 1024)
+    LogRecord(ip='127.0.0.1', timestamp='24/May/2024:14:00:00 +0000', method='GET', url='/', status=200, bytes=1024, referrer='-', user_agent='-')
+    """
+    ip: str
+    timestamp: str
+    method: str
+    url: str
+    status: int
+    bytes: int
+    referrer: str = "-"
+    user_agent: str = "-"
+
+
+def parse_line(line: str) -> Optional[LogRecord]:
+    """
+    Parse one line in Apache combined (or common) log format. Malformed lines give None instead of an exception.
+
+    >>> parse_line('1.2.3.4 - - [24/Jan/2016:07:19:28 +0100] "GET /robots.txt HTTP/1.1" 404 45540 "-" "Mozilla/5.0 (compatible; bingbot/2.0)"')
+    LogRecord(ip='1.2.3.4', timestamp='24/Jan/2016:07:19:28 +0100', method='GET', url='/robots.txt', status=404, bytes=45540, referrer='-', user_agent='Mozilla/5.0 (compatible; bingbot/2.0)')
+    >>> parse_line('1.2.3.4 - - [24/Jan/2016:13:02:10 +0100] "-" 408 0 "-" "-"')
+    LogRecord(ip='1.2.3.4', timestamp='24/Jan/2016:13:02:10 +0100', method='-', url='-', status=408, bytes=0, referrer='-', user_agent='-')
+    >>> parse_line('kaputt') is None
+    True
+    """
+    match = COMBINED_PATTERN.match(line)
+    if match is not None:
+        ip, timestamp, method, url, status, bytes_transferred, referrer, user_agent = match.groups()
+        return _new_record(LogRecord, (ip, timestamp, method, url, int(status), int(bytes_transferred),
+                                       referrer, user_agent))
+    return _parse_irregular(line)
+
+
+def _parse_irregular(line: str) -> Optional[LogRecord]:
+    # common log format, Request ohne Methode und URL, "-" statt Bytes
+    match = LOG_PATTERN.match(line)
+    if not match:
+        return None
+    ip, timestamp, request, status, bytes_transferred, referrer, user_agent = match.groups()
+    request = request.split()
+    return LogRecord(ip, timestamp, request[0] if request else "-", request[1] if len(request) > 1 else "-",
+                     int(status), int(bytes_transferred) if bytes_transferred.isdigit() else 0,
+                     referrer or "-", user_agent or "-")
+
+
+def parse_lines(lines: Iterable[str]) -> Generator[LogRecord, None, None]:
+    """
+    Generator function to parse log lines into LogRecords. Malformed lines are skipped.
+    Same as parse_line for every line, but with the fast path inlined.
+
+    :param lines: Iterable of log lines
+    :return: Generator yielding LogRecords
+
+    >>> [r.url for r in parse_lines(['1.2.3.4 - - [24/Jan/2016:07:19:28 +0100] "GET / HTTP/1.1" 200 854', 'kaputt'])]
+    ['/']
+    """
+    match_combined, new_record, record_type = COMBINED_PATTERN.match, _new_record, LogRecord  # lokale Namen
+    for line in lines:
+        match = match_combined(line)
+        if match is not None:
+            ip, timestamp, method, url, status, bytes_transferred, referrer, user_agent = match.groups()
+            yield new_record(record_type, (ip, timestamp, method, url, int(status), int(bytes_transferred),
+                                           referrer, user_agent))
+        else:
+            record = _parse_irregular(line)
+            if record is not None:
+                yield record
 
 
 def extract_fields(lines: Iterable[str]) -> Generator[Tuple[str, str, int], None, None]:
     """
     Extract fields from log lines. Assumes Apache combined log format.
-    Yields tuples of (IP address, URL, bytes transferred).
+    Yields tuples of (IP address, URL, bytes transferred). Malformed lines are skipped.
 
     :param lines: Iterable of log lines
     :return: Generator yielding tuples (IP, URL, bytes)
@@ -25,25 +125,62 @@ def extract_fields(lines: Iterable[str]) -> Generator[Tuple[str, str, int], None
     >>> lines = ['127.0.0.1 - - [24/May/2024:14:00:00 +0000] "GET /index.html HTTP/1.1" 200 1024']
     >>> list(extract_fields(lines))
     [('127.0.0.1', '/index.html', 1024)]
+    >>> list(extract_fields(['1.2.3.4 - - [24/Jan/2016:13:02:10 +0100] "-" 408 0 "-" "-"', 'kaputt']))
+    [('1.2.3.4', '-', 0)]
     """
     for line in lines:
-        parts = line.split()
-        ip = parts[0]
-        url = parts[6]
-        bytes_transferred = int(parts[9]) if parts[9].isdigit() else 0
-        yield ip, url, bytes_transferred
+        # höchstens 10 Mal teilen, der Rest (Referrer, User-Agent) bleibt ein String
+        parts = line.split(" ", 10)
+        if len(parts) >= 10 and parts[5][:1] == '"' and parts[7][-1:] == '"':
+            bytes_transferred = parts[9]
+            yield parts[0], parts[6], int(bytes_transferred) if bytes_transferred.isdigit() else 0
+        else:
+            record = parse_line(line)  # unregelmäßige Zeile, fehlerhafte Zeilen werden übersprungen
+            if record is not None:
+                yield record.ip, record.url, record.bytes
 
 
-def count_requests(extracted_fields: Iterable[Tuple[str, str, int]]) -> Tuple[str, str, int]:
+def extract_fields_bytes(lines: Iterable[bytes], decode: bool = True) -> Generator[Tuple, None, None]:
     """
-    Count the number of requests per IP, per URL and sum the bytes transferred.
+    Like extract_fields, but for undecoded lines, e.g. from read_lines_mmap. Only IP and URL are decoded,
+    with decode=False not even those: they stay bytes, which count_fields can count just as well, and only the
+    final result has to be decoded.
+
+    :param lines: Iterable of log lines as bytes
+    :param decode: decode IP and URL to str
+    :return: Generator yielding tuples (IP, URL, bytes)
+
+    >>> list(extract_fields_bytes([b'127.0.0.1 - - [24/May/2024:14:00:00 +0000] "GET /index.html HTTP/1.1" 200 1024']))
+    [('127.0.0.1', '/index.html', 1024)]
+    >>> list(extract_fields_bytes([b'1.2.3.4 - - [24/Jan/2016:13:02:10 +0100] "-" 408 0 "-" "-"', b'kaputt'], False))
+    [(b'1.2.3.4', b'-', 0)]
+    """
+    for line in lines:
+        parts = line.split(b" ", 10)
+        if len(parts) >= 10 and parts[5][:1] == b'"' and parts[7][-1:] == b'"':
+            bytes_transferred = parts[9]
+            if decode:
+                yield parts[0].decode(), parts[6].decode(), int(bytes_transferred) if bytes_transferred.isdigit() else 0
+            else:
+                yield parts[0], parts[6], int(bytes_transferred) if bytes_transferred.isdigit() else 0
+        else:
+            record = parse_line(line.decode())
+            if record is not None:
+                if decode:
+                    yield record.ip, record.url, record.bytes
+                else:
+                    yield record.ip.encode(), record.url.encode(), record.bytes
+
+
+def count_fields(extracted_fields: Iterable[Tuple[str, str, int]]) -> Tuple[Counter, Counter, int]:
+    """
+    Count the requests per IP and per URL and sum the bytes transferred.
 
     :param extracted_fields: Iterable of tuples (IP, URL, bytes)
-    :return: Tuple containing (most active IP, most requested URL, total bytes)
+    :return: Tuple containing (IP counter, URL counter, total bytes)
 
-    >>> fields = [('127.0.0.1', '/index.html', 1024), ('127.0.0.1', '/index.html', 2048), ('192.168.0.1', '/about.html', 512)]
-    >>> count_requests(fields)
-    ('127.0.0.1', '/index.html', 3584)
+    >>> count_fields([('127.0.0.1', '/index.html', 1024), ('192.168.0.1', '/index.html', 512)])
+    (Counter({'127.0.0.1': 1, '192.168.0.1': 1}), Counter({'/index.html': 2}), 1536)
     """
     ip_counter = Counter()
     url_counter = Counter()
@@ -54,12 +191,528 @@ def count_requests(extracted_fields: Iterable[Tuple[str, str, int]]) -> Tuple[st
         url_counter[url] += 1
         total_bytes += bytes_transferred
 
+    return ip_counter, url_counter, total_bytes
+
+
+def most_common(ip_counter: Counter, url_counter: Counter, total_bytes: int) -> Tuple[str, str, int]:
+    """
+    Reduce the counters to (most active IP, most requested URL, total bytes).
+    """
     most_active_ip = ip_counter.most_common(1)[0][0]
     most_requested_url = url_counter.most_common(1)[0][0]
 
     return most_active_ip, most_requested_url, total_bytes
 
 
+class RequestStats(ABC):
+    """
+    Interface of the request statistics that count_requests and windowed count into.
+    Subclasses count IPs and URLs; the bytes are summed in total_bytes.
+    """
+
+    def __init__(self):
+        self.total_bytes = 0
+
+    @abstractmethod
+    def add(self, ip: str, url: str, bytes_transferred: int) -> None:
+        """
+        Counts one request.
+        """
+
+    @abstractmethod
+    def top_ips(self, n: int = 10) -> List[Tuple[str, int]]:
+        """
+        The n most active IPs with their number of requests.
+        """
+
+    @abstractmethod
+    def top_urls(self, n: int = 10) -> List[Tuple[str, int]]:
+        """
+        The n most requested URLs with their number of requests.
+        """
+
+    @abstractmethod
+    def distinct_ips(self) -> int:
+        """
+        Number of distinct IPs.
+        """
+
+    def result(self) -> Tuple[str, str, int]:
+        """
+        (most active IP, most requested URL, total bytes) like count_requests.
+        """
+        return self.top_ips(1)[0][0], self.top_urls(1)[0][0], self.total_bytes
+
+
+class ExactStats(RequestStats):
+    """
+    Exact request statistics with Counters. Memory grows with the number of distinct IPs and URLs.
+
+    >>> stats = ExactStats()
+    >>> for fields in [('127.0.0.1', '/', 10), ('127.0.0.1', '/a', 20), ('10.0.0.1', '/', 30)]:
+    ...     stats.add(*fields)
+    >>> stats.result(), stats.distinct_ips()
+    (('127.0.0.1', '/', 60), 2)
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.ip_counter = Counter()
+        self.url_counter = Counter()
+
+    def add(self, ip: str, url: str, bytes_transferred: int) -> None:
+        self.ip_counter[ip] += 1
+        self.url_counter[url] += 1
+        self.total_bytes += bytes_transferred
+
+    def top_ips(self, n: int = 10) -> List[Tuple[str, int]]:
+        return self.ip_counter.most_common(n)
+
+    def top_urls(self, n: int = 10) -> List[Tuple[str, int]]:
+        return self.url_counter.most_common(n)
+
+    def distinct_ips(self) -> int:
+        return len(self.ip_counter)
+
+    def result(self) -> Tuple[str, str, int]:
+        return most_common(self.ip_counter, self.url_counter, self.total_bytes)
+
+
+class ApproximateStats(RequestStats):
+    """
+    Approximate request statistics with fixed memory: Space-Saving for the top IPs and URLs,
+    a Count-Min Sketch for the frequency of any URL and a HyperLogLog for the number of distinct IPs.
+
+    >>> stats = ApproximateStats(top_k=10)
+    >>> for fields in [('127.0.0.1', '/', 10), ('127.0.0.1', '/a', 20), ('10.0.0.1', '/', 30)]:
+    ...     stats.add(*fields)
+    >>> stats.result(), stats.distinct_ips(), stats.url_sketch.estimate('/')
+    (('127.0.0.1', '/', 60), 2, 2)
+    """
+
+    def __init__(self, top_k: int = 1000, epsilon: float = 0.001, delta: float = 0.01, distinct_error: float = 0.01):
+        """
+        Constructor.
+        :param top_k: number of counters for the top IPs and URLs
+        :param epsilon: relative error of the Count-Min Sketch
+        :param delta: probability that the error of the Count-Min Sketch is larger
+        :param distinct_error: relative standard error of the distinct IP count
+        """
+        super().__init__()
+        self.ip_top = SpaceSaving(top_k)
+        self.url_top = SpaceSaving(top_k)
+        self.url_sketch = CountMinSketch(epsilon, delta)
+        self.ip_distinct = HyperLogLog(distinct_error)
+
+    def add(self, ip: str, url: str, bytes_transferred: int) -> None:
+        self.ip_top.add(ip)
+        self.url_top.add(url)
+        self.url_sketch.add(url)
+        self.ip_distinct.add(ip)
+        self.total_bytes += bytes_transferred
+
+    def top_ips(self, n: int = 10) -> List[Tuple[str, int]]:
+        return self.ip_top.top(n)
+
+    def top_urls(self, n: int = 10) -> List[Tuple[str, int]]:
+        return self.url_top.top(n)
+
+    def distinct_ips(self) -> int:
+        return self.ip_distinct.count()
+
+
+def count_requests(extracted_fields: Iterable[Tuple[str, str, int]],
+                   stats: Optional[RequestStats] = None) -> Tuple[str, str, int]:
+    """
+    Count the number of requests per IP, per URL and sum the bytes transferred.
+
+    :param extracted_fields: Iterable of tuples (IP, URL, bytes)
+    :param stats: RequestStats to count into, e.g. ExactStats or ApproximateStats, default is the exact count
+    :return: Tuple containing (most active IP, most requested URL, total bytes)
+
+    >>> fields = [('127.0.0.1', '/index.html', 1024), ('127.0.0.1', '/index.html', 2048), ('192.168.0.1', '/about.html', 512)]
+    >>> count_requests(fields)
+    ('127.0.0.1', '/index.html', 3584)
+    >>> count_requests(fields, ApproximateStats())
+    ('127.0.0.1', '/index.html', 3584)
+    """
+    if stats is None:
+        return most_common(*count_fields(extracted_fields))
+    for ip, url, bytes_transferred in extracted_fields:
+        stats.add(ip, url, bytes_transferred)
+    return stats.result()
+
+
+@lru_cache(maxsize=1024)
+def day_start(date: str, offset: str) -> int:
+    """
+    Unix time of midnight of date ("24/Jan/2016") in the time zone offset ("+0100").
+    Cached, because all lines of a day share the same date prefix.
+    """
+    day, month, year = date.split("/")
+    seconds = calendar.timegm((int(year), MONTHS[month], int(day), 0, 0, 0))
+    utc_offset = int(offset[1:3]) * 3600 + int(offset[3:5]) * 60
+    return seconds - utc_offset if offset[0] == "+" else seconds + utc_offset
+
+
+def parse_timestamp(timestamp: str) -> int:
+    """
+    Parse a log timestamp into Unix time without calling strptime for every line.
+
+    :param timestamp: timestamp like "24/Jan/2016:07:19:28 +0100"
+    :return: seconds since 1970-01-01 UTC
+    :raises ValueError: if the timestamp is malformed
+
+    >>> from datetime import datetime
+    >>> parse_timestamp("24/Jan/2016:07:19:28 +0100")
+    1453616368
+    >>> int(datetime.strptime("24/Jan/2016:07:19:28 +0100", "%d/%b/%Y:%H:%M:%S %z").timestamp())
+    1453616368
+    >>> parse_timestamp("24/Foo/2016:07:19:28 +0100")
+    Traceback (most recent call last):
+    ...
+    ValueError: Malformed timestamp: '24/Foo/2016:07:19:28 +0100'
+    """
+    try:
+        return day_start(timestamp[:11], timestamp[21:26]) \
+            + int(timestamp[12:14]) * 3600 + int(timestamp[15:17]) * 60 + int(timestamp[18:20])
+    except (KeyError, IndexError):
+        raise ValueError(f"Malformed timestamp: {timestamp!r}") from None
+
+
+def extract_timed_fields(lines: Iterable[str]) -> Generator[Tuple[int, str, str, int], None, None]:
+    """
+    Like extract_fields, but keeps the timestamp.
+    Yields tuples of (Unix time, IP address, URL, bytes transferred). Malformed lines are skipped.
+
+    :param lines: Iterable of log lines
+    :return: Generator yielding tuples (time, IP, URL, bytes)
+
+    >>> list(extract_timed_fields(['127.0.0.1 - - [24/May/2024:14:00:00 +0000] "GET /index.html HTTP/1.1" 200 1024']))
+    [(1716559200, '127.0.0.1', '/index.html', 1024)]
+    >>> list(extract_timed_fields(['127.0.0.1 - - [bad] "GET / HTTP/1.1" 200 1 "-" "-"',
+    ...                            '127.0.0.1 - - [24/Foo/2016:07:19:28 +0100] "GET / HTTP/1.1" 200 2',
+    ...                            '127.0.0.1 - - [24/Jan/2016:07:19:28 +0100] "GET / HTTP/1.1" 200 3']))
+    [(1453616368, '127.0.0.1', '/', 3)]
+    """
+    for line in lines:
+        parts = line.split(" ", 10)
+        if len(parts) >= 10 and parts[5][:1] == '"' and parts[7][-1:] == '"' and parts[3][:1] == "[":
+            timestamp, ip, url = parts[3][1:] + " " + parts[4][:-1], parts[0], parts[6]
+            bytes_transferred = int(parts[9]) if parts[9].isdigit() else 0
+        else:
+            record = parse_line(line)
+            if record is None:
+                continue
+            timestamp, ip, url, bytes_transferred = record.timestamp, record.ip, record.url, record.bytes
+        try:
+            seconds = parse_timestamp(timestamp)
+        except ValueError:
+            continue  # fehlerhafter Zeitstempel, die Zeile wird übersprungen
+        yield seconds, ip, url, bytes_transferred
+
+
+class Window(NamedTuple):
+    """
+    Aggregates of one time window [start, end).
+    """
+    start: int
+    end: int
+    requests: int
+    bytes: int
+    top_ip: str
+    top_url: str
+
+
+def windowed(timed_fields: Iterable[Tuple[int, str, str, int]], size: int, step: Optional[int] = None,
+             lateness: int = 0,
+             stats_factory: Callable[[], RequestStats] = ExactStats) -> Generator[Window, None, None]:
+    """
+    Generator function for time-windowed aggregates. Tumbling windows (step = size) or sliding windows
+    (step < size, every record is counted in size / step windows). Only the open windows are kept in memory.
+    A window is yielded as soon as the newest timestamp minus lateness has passed its end; log files are only
+    roughly sorted by time, so lateness allows for records that arrive late. Records for windows that were
+    already yielded are dropped. Windows without requests are not yielded.
+
+    :param timed_fields: Iterable of tuples (time, IP, URL, bytes), e.g. from extract_timed_fields
+    :param size: window size in seconds
+    :param step: distance between window starts in seconds, default size (tumbling)
+    :param lateness: seconds a record may be older than the newest one seen
+    :param stats_factory: class for the statistics of a window, e.g. ApproximateStats for bounded memory
+    :return: Generator yielding Windows in order
+
+    >>> fields = [(0, 'a', '/', 10), (30, 'b', '/x', 20), (70, 'b', '/x', 5), (200, 'a', '/', 1)]
+    >>> for window in windowed(fields, 60):
+    ...     print(window)
+    Window(start=0, end=60, requests=2, bytes=30, top_ip='a', top_url='/')
+    Window(start=60, end=120, requests=1, bytes=5, top_ip='b', top_url='/x')
+    Window(start=180, end=240, requests=1, bytes=1, top_ip='a', top_url='/')
+    >>> [(w.start, w.requests) for w in windowed(fields, 60, step=30)]
+    [(-30, 1), (0, 2), (30, 2), (60, 1), (150, 1), (180, 1)]
+    """
+    step = step or size
+    if not 0 < step <= size:
+        raise ValueError("step must be between 1 and size.")
+    open_windows: Dict[int, list] = {}  # start -> [requests, stats]
+    closed_until = None  # Ende des zuletzt ausgegebenen Fensters
+    newest = None
+
+    def close(watermark):
+        nonlocal closed_until
+        for start in sorted(open_windows):
+            if start + size > watermark:
+                break
+            requests, stats = open_windows.pop(start)
+            closed_until = start + size
+            yield Window(start, start + size, requests, stats.total_bytes, *stats.result()[:2])
+
+    for timestamp, ip, url, bytes_transferred in timed_fields:
+        if newest is None or timestamp > newest:
+            newest = timestamp
+            yield from close(newest - lateness)
+        # alle Fenster, in denen timestamp liegt: start <= timestamp < start + size
+        start = timestamp - timestamp % step
+        while start + size > timestamp:
+            if closed_until is not None and start + size <= closed_until:
+                break  # zu spät, das Fenster wurde schon ausgegeben
+            window = open_windows.get(start)
+            if window is None:
+                window = open_windows[start] = [0, stats_factory()]
+            window[0] += 1
+            window[1].add(ip, url, bytes_transferred)
+            start -= step
+    if newest is not None:
+        yield from close(float("inf"))
+
+
+def shard_files(filenames: Iterable[str], shard_size: int = SHARD_SIZE) -> List[Tuple[str, int, int]]:
+    """
+    Split files into shards (filename, start, end) of at most shard_size bytes.
+    The shards of a file are in file order, so merging them in order gives the same result as reading sequentially.
+
+    :param filenames: Iterable of filenames
+    :param shard_size: maximum number of bytes per shard, compressed files are always one shard
+    :return: List of shards
+
+    >>> shard_files(["logs/access.log"], 600000)
+    [('logs/access.log', 0, 600000), ('logs/access.log', 600000, 1200000), ('logs/access.log', 1200000, 1512352)]
+    """
+    shards = []
+    for fn in filenames:
+        size = os.path.getsize(fn)
+        if detect_compression(fn):
+            shards.append((fn, 0, size))  # komprimierte Dateien können nicht mitten drin gelesen werden
+        else:
+            shards.extend((fn, start, min(start + shard_size, size)) for start in range(0, size, shard_size))
+    return shards
+
+
+def read_shard(shard: Tuple[str, int, int]) -> Generator[str, None, None]:
+    """
+    Generator function to read the lines of a shard. A line belongs to the shard in which it starts,
+    so a shard skips the incomplete first line and reads past its end to finish the last line.
+
+    :param shard: (filename, start, end)
+    :return: Generator yielding lines
+    """
+    fn, start, end = shard
+    if detect_compression(fn):
+        yield from read_lines(open_files([fn]))
+        return
+    with open(fn, "rb") as f:
+        if start > 0:
+            f.seek(start - 1)
+            f.readline()  # Rest der Zeile gehört zum vorherigen Shard
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            yield line.decode().rstrip()
+
+
+def count_shard(shard: Tuple[str, int, int]) -> Tuple[Counter, Counter, int]:
+    """
+    Count the requests of one shard (runs in a worker process).
+    """
+    return count_fields(extract_fields(read_shard(shard)))
+
+
+def count_requests_parallel(filenames: Iterable[str], jobs: Optional[int] = None,
+                            shard_size: int = SHARD_SIZE) -> Tuple[str, str, int]:
+    """
+    Same result as count_requests(extract_fields(read_lines(open_files(filenames)))), but the files are split
+    into shards that are counted in worker processes. The partial counters are merged in shard order.
+
+    :param filenames: Iterable of filenames
+    :param jobs: number of worker processes
+    :param shard_size: maximum number of bytes per shard
+    :return: Tuple containing (most active IP, most requested URL, total bytes)
+
+    >>> count_requests_parallel(["logs/access.log"], jobs=2, shard_size=100000) == \
+    count_requests(extract_fields(read_lines(open_files(["logs/access.log"]))))
+    True
+    """
+    ip_counter = Counter()
+    url_counter = Counter()
+    total_bytes = 0
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for ips, urls, bytes_transferred in executor.map(count_shard, shard_files(filenames, shard_size)):
+            ip_counter.update(ips)
+            url_counter.update(urls)
+            total_bytes += bytes_transferred
+
+    return most_common(ip_counter, url_counter, total_bytes)
+
+
+class Checkpoint:
+    """
+    Checkpoint for incremental analysis: per file inode, size, mtime, offset of the last complete line that was read
+    and a fingerprint of its first bytes, plus the aggregated counters. Only bytes appended since the last run are
+    read. A file is recognised by the fingerprint of its first bytes, whatever its name and inode, so it continues at
+    its offset after a rotation by renaming, by copying (copytruncate) or with compression. A plain file that got
+    smaller than at the last run was truncated, a new, truncated or rewritten file is read from the start.
+    Compressed files are finished archives: if size, mtime and inode are unchanged they are not decompressed again.
+
+    >>> import tempfile
+    >>> directory = tempfile.mkdtemp()
+    >>> log, checkpoint = os.path.join(directory, "access.log"), os.path.join(directory, "checkpoint.json")
+    >>> line = '127.0.0.1 - - [24/May/2024:14:00:00 +0000] "GET / HTTP/1.1" 200 100\\n'
+    >>> with open(log, "w") as f:
+    ...     _ = f.write(line * 2 + line[:20])  # die letzte Zeile ist noch nicht fertig geschrieben
+    >>> count_requests_incremental([log], checkpoint)
+    ('127.0.0.1', '/', 200)
+    >>> with open(log, "a") as f:
+    ...     _ = f.write(line[20:] + line)
+    >>> count_requests_incremental([log], checkpoint)
+    ('127.0.0.1', '/', 400)
+    >>> os.rename(log, log + ".1")  # Rotation
+    >>> with open(log, "w") as f:
+    ...     _ = f.write(line)
+    >>> count_requests_incremental([log + ".1", log], checkpoint)
+    ('127.0.0.1', '/', 500)
+    >>> with open(log + ".1", "rb") as f, gzip.open(log + ".2.gz", "wb") as compressed:
+    ...     _ = compressed.write(f.read())
+    >>> os.remove(log + ".1")  # Rotation mit Komprimierung
+    >>> count_requests_incremental([log + ".2.gz", log], checkpoint)
+    ('127.0.0.1', '/', 500)
+    >>> with open(log, "w") as f:  # abgeschnitten und länger als vorher neu geschrieben
+    ...     _ = f.write(line.replace("100", "1") * 3)
+    >>> count_requests_incremental([log + ".2.gz", log], checkpoint)
+    ('127.0.0.1', '/', 503)
+    >>> import shutil
+    >>> _ = shutil.copy(log, log + ".1")  # copytruncate: Kopie rotieren, Inode des Originals bleibt
+    >>> with open(log, "w") as f:
+    ...     _ = f.write(line.replace("100", "1"))
+    >>> count_requests_incremental([log + ".2.gz", log + ".1", log], checkpoint)
+    ('127.0.0.1', '/', 504)
+    """
+
+    def __init__(self, filename: str):
+        """
+        Constructor. Loads the checkpoint file if it exists.
+        :param filename: name of the checkpoint file (JSON)
+        """
+        self.filename = filename
+        self.files: Dict[str, Dict[str, float]] = {}
+        self.ip_counter = Counter()
+        self.url_counter = Counter()
+        self.total_bytes = 0
+        if os.path.exists(filename):
+            with open(filename) as f:
+                data = json.load(f)
+            self.files = data["files"]
+            self.ip_counter = Counter(data["ip_counter"])
+            self.url_counter = Counter(data["url_counter"])
+            self.total_bytes = data["total_bytes"]
+
+    def start_offset(self, head: bytes, inode: Optional[int] = None, size: Optional[int] = None) -> int:
+        """
+        Offset at which reading of a file continues: the offset of the known file whose first bytes match.
+
+        :param head: the first FINGERPRINT_SIZE bytes of the (decompressed) file
+        :param inode: inode of a plain file, None for a compressed file
+        :param size: size of a plain file, None for a compressed file
+        :return: offset in the (decompressed) content, 0 for a new, truncated or rewritten file
+        """
+        for state in self.files.values():
+            if not state["offset"] or hash64(head[:state["offset"]]) != state["head"]:
+                continue
+            if size is not None and (size < state["offset"] or state["inode"] == inode and size < state["size"]):
+                continue  # abgeschnitten
+            return state["offset"]
+        return 0
+
+    def unchanged_archive(self, stat: os.stat_result) -> Optional[Dict[str, float]]:
+        """
+        The state of a compressed file with the same inode, size and mtime as at the last run, else None.
+        """
+        for state in self.files.values():
+            if (state["inode"], state["size"], state.get("mtime")) == (stat.st_ino, stat.st_size, stat.st_mtime):
+                return state
+        return None
+
+    def new_lines(self, filenames: Iterable[str]) -> Generator[str, None, None]:
+        """
+        Generator function yielding the complete lines appended since the last run and updating the offsets.
+
+        :param filenames: Iterable of filenames
+        :return: Generator yielding lines
+        """
+        files = {}
+        for fn in filenames:
+            stat = os.stat(fn)
+            opener = detect_compression(fn)
+            if opener:
+                state = self.unchanged_archive(stat)
+                if state is not None:
+                    files[fn] = state  # fertiges Archiv, seek würde bis zum Offset entpacken
+                    continue
+            with opener(fn, "rb") if opener else open(fn, "rb") as f:
+                head = f.read(FINGERPRINT_SIZE)
+                if opener:
+                    offset = self.start_offset(head)
+                else:
+                    offset = self.start_offset(head, stat.st_ino, stat.st_size)
+                f.seek(offset)
+                for raw in f:
+                    if not raw.endswith(b"\n") and not opener:
+                        break  # unvollständige Zeile, wird beim nächsten Mal gelesen
+                    offset += len(raw)
+                    yield raw.decode().rstrip()
+            files[fn] = {"inode": stat.st_ino, "size": stat.st_size, "mtime": stat.st_mtime, "offset": offset,
+                         "head": hash64(head[:offset])}
+        self.files = files
+
+    def save(self) -> None:
+        """
+        Saves the checkpoint atomically (write to a temporary file, then replace).
+        """
+        data = {"files": self.files, "ip_counter": self.ip_counter, "url_counter": self.url_counter,
+                "total_bytes": self.total_bytes}
+        with open(self.filename + ".tmp", "w") as f:
+            json.dump(data, f)
+        os.replace(self.filename + ".tmp", self.filename)
+
+
+def count_requests_incremental(filenames: Iterable[str], checkpoint_file: str) -> Tuple[str, str, int]:
+    """
+    Like count_requests, but only the lines appended since the last run are parsed and merged into the
+    aggregates stored in checkpoint_file. See Checkpoint.
+
+    :param filenames: Iterable of filenames
+    :param checkpoint_file: name of the checkpoint file
+    :return: Tuple containing (most active IP, most requested URL, total bytes) over all runs
+    """
+    checkpoint = Checkpoint(checkpoint_file)
+    ip_counter, url_counter, total_bytes = count_fields(extract_fields(checkpoint.new_lines(filenames)))
+    checkpoint.ip_counter.update(ip_counter)
+    checkpoint.url_counter.update(url_counter)
+    checkpoint.total_bytes += total_bytes
+    checkpoint.save()
+    return most_common(checkpoint.ip_counter, checkpoint.url_counter, checkpoint.total_bytes)
+
+
 if __name__ == "__main__":
     import doctest
 
@@ -76,3 +729,55 @@ if __name__ == "__main__":
     print(f"Most active IP: {most_active_ip}")
     print(f"Most requested URL: {most_requested_url}")
     print(f"Total bytes transferred: {total_bytes}")
+
+    # Parallel: Dateien in Shards aufteilen und in mehreren Prozessen zählen
+    print(f"Parallel: {count_requests_parallel(list(get_all_files(directory_path)))}")
+
+    # Inkrementell: beim nächsten Aufruf werden nur neue Zeilen gelesen
+    print(f"Incremental: {count_requests_incremental(list(get_all_files(directory_path)), 'checkpoint.json')}")
+
+    # Näherung mit festem Speicher
+    stats = ApproximateStats()
+    print(f"Approximate: {count_requests(extract_fields(read_lines(open_files(get_all_files(directory_path)))), stats)}, "
+          f"distinct IPs ~ {stats.distinct_ips()}")
+
+    # Anfragen pro Stunde, Zeilen dürfen bis zu 10 Minuten zu spät kommen
+    for window in windowed(extract_timed_fields(read_lines(open_files(get_all_files(directory_path)))), 3600,
+                           lateness=600):
+        print(window)
+
+    # Parser-Benchmark: access.log 50 Mal hintereinander
+    import time
+    with open("logs/access.log") as f:
+        log_lines = [line.rstrip() for line in f] * 50
+    old_split = lambda ls: ((p[0], p[6], int(p[9]) if p[9].isdigit() else 0) for p in (l.split() for l in ls))
+    for name, parser in [("split", old_split),
+                         ("extract_fields", extract_fields), ("parse_lines", parse_lines)]:
+        start = time.perf_counter()
+        for _ in parser(log_lines):
+            pass
+        elapsed = time.perf_counter() - start
+        print(f"{name:>15}: {elapsed / len(log_lines) * 1e9:.0f} ns pro Zeile")
+
+    # Lesen und Extrahieren: Textdatei gegen mmap mit Bytes
+    for name, pipeline in [("read_lines", lambda: extract_fields(read_lines(open_files(["logs/access.log"])))),
+                           ("read_lines_mmap", lambda: extract_fields_bytes(read_lines_mmap(["logs/access.log"]))),
+                           ("mmap undecoded", lambda: extract_fields_bytes(read_lines_mmap(["logs/access.log"]),
+                                                                           decode=False))]:
+        start = time.perf_counter()
+        for _ in range(50):
+            for _ in pipeline():
+                pass
+        elapsed = time.perf_counter() - start
+        print(f"{name:>15}: {elapsed / len(log_lines) * 1e9:.0f} ns pro Zeile")
+
+    # Zeitstempel: zwischengespeichertes Datum gegen strptime
+    from datetime import datetime
+    timestamps = [line.split(" ", 5)[3][1:] + " " + line.split(" ", 5)[4][:-1] for line in log_lines]
+    for name, parser in [("strptime", lambda t: datetime.strptime(t, "%d/%b/%Y:%H:%M:%S %z").timestamp()),
+                         ("parse_timestamp", parse_timestamp)]:
+        start = time.perf_counter()
+        for timestamp in timestamps:
+            parser(timestamp)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>15}: {elapsed / len(timestamps) * 1e9:.0f} ns pro Zeitstempel")
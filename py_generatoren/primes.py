@@ -8,8 +8,12 @@ __status__ = "Development"
 """
 
 import itertools
+import math
 import time
 
+# Anzahl ungerader Zahlen pro Segment (ein Byte pro Zahl), passt in den L2-Cache
+SEGMENT_SIZE = 256 * 1024
+
 
 def is_prime(n):
     """
@@ -57,6 +61,119 @@ def primes():
         n += 2
 
 
+def odd_primes_upto(n):
+    """
+    Simple sieve of Eratosthenes over the odd numbers, for the base primes of the segmented sieve.
+    :param n: upper bound (inclusive)
+    :return: list of the odd primes <= n
+
+    >>> odd_primes_upto(30)
+    [3, 5, 7, 11, 13, 17, 19, 23, 29]
+    """
+    if n < 3:
+        return []
+    flags = bytearray(b"\x01") * ((n - 1) // 2)  # flags[i] steht für 2 * i + 3
+    for i in range((math.isqrt(n) - 1) // 2):
+        if flags[i]:
+            p = 2 * i + 3
+            start = (p * p - 3) // 2
+            flags[start::p] = bytes(len(range(start, len(flags), p)))
+    return list(itertools.compress(range(3, n + 1, 2), flags))
+
+
+def segments(limit=None, segment_size=SEGMENT_SIZE):
+    """
+    Generator function for the segmented sieve of Eratosthenes over the odd numbers >= 3.
+    Every segment is a bytearray of segment_size flags, so only one segment and the base primes up to
+    the square root are in memory at a time.
+    :param limit: sieve the numbers < limit, None = infinitely many
+    :param segment_size: number of odd numbers per segment
+    :return: tuples (low, flags), flags[i] == 1 if low + 2 * i is prime
+
+    >>> [(low, list(flags)) for low, flags in segments(20, 4)]
+    [(3, [1, 1, 1, 0]), (11, [1, 1, 0, 1]), (19, [1])]
+    """
+    base = []
+    base_limit = 1
+    low = 3
+    while limit is None or low < limit:
+        high = low + 2 * segment_size if limit is None else min(low + 2 * segment_size, limit)
+        count = (high - low + 1) // 2
+        root = math.isqrt(high - 1)
+        if root > base_limit:
+            base_limit = max(root, 2 * base_limit)
+            base = odd_primes_upto(base_limit)
+        flags = bytearray(b"\x01") * count
+        for p in base:
+            if p * p >= high:
+                break
+            # erstes ungerades Vielfaches von p im Segment, aber nicht p selbst
+            start = max(p * p, (low + p - 1) // p * p)
+            if start % 2 == 0:
+                start += p
+            index = (start - low) // 2
+            if index < count:
+                flags[index::p] = bytes((count - 1 - index) // p + 1)
+        yield low, flags
+        low += 2 * count
+
+
+def sieve_primes():
+    """
+    Generator function like primes(), but backed by the segmented sieve instead of trial division.
+    :return: prime number
+
+    >>> list(itertools.islice(sieve_primes(), 10))
+    [2, 3, 5, 7, 11, 13, 17, 19, 23, 29]
+    """
+    yield 2
+    for low, flags in segments():
+        yield from itertools.compress(range(low, low + 2 * len(flags), 2), flags)
+
+
+def primes_below(n):
+    """
+    All prime numbers below n.
+    :param n: upper bound (exclusive)
+    :return: list of prime numbers
+
+    >>> primes_below(30)
+    [2, 3, 5, 7, 11, 13, 17, 19, 23, 29]
+    >>> primes_below(2), len(primes_below(1000000))
+    ([], 78498)
+    """
+    if n <= 2:
+        return []
+    result = [2]
+    for low, flags in segments(n):
+        result.extend(itertools.compress(range(low, low + 2 * len(flags), 2), flags))
+    return result
+
+
+def nth_prime(n):
+    """
+    The n-th prime number (nth_prime(1) == 2). Counts whole segments with bytearray.count,
+    only the last segment is searched number by number.
+    :param n: index, starting at 1
+    :return: prime number
+
+    >>> nth_prime(1), nth_prime(10), nth_prime(200000)
+    (2, 29, 2750159)
+    """
+    if n < 1:
+        raise ValueError("n must be at least 1")
+    if n == 1:
+        return 2
+    remaining = n - 1
+    for low, flags in segments():
+        found = flags.count(1)
+        if found < remaining:
+            remaining -= found
+        else:
+            return next(itertools.islice(itertools.compress(range(low, low + 2 * len(flags), 2), flags),
+                                         remaining - 1, None))
+
+
 if __name__ == "__main__":
     import doctest
     doctest.testmod()
@@ -77,3 +194,21 @@ if __name__ == "__main__":
     prime_400000 = next(itertools.islice(primes(), 399999, None))
     end2 = time.time()
     print("400.000-te Primzahl:", prime_400000, "benötigte Zeit:", end2 - start2)
+
+    # Benchmark: Probedivision gegen Sieb, die 10.000.000-te Primzahl nur mit dem Sieb (Probedivision braucht Stunden)
+    for n in [200000, 400000, 10000000]:
+        for name, function in [("primes", lambda: next(itertools.islice(primes(), n - 1, None))),
+                               ("sieve_primes", lambda: next(itertools.islice(sieve_primes(), n - 1, None))),
+                               ("nth_prime", lambda: nth_prime(n))]:
+            if name == "primes" and n > 400000:
+                continue
+            start = time.time()
+            prime = function()
+            print(f"{n:>9}-te Primzahl mit {name:>12}: {prime} in {time.time() - start:.3f} s")
+
+    # Length.primes dividiert durch alle Zahlen unter dem Kandidaten, schon 2.000 Primzahlen dauern
+    from py_plfUebung.Length import primes as length_primes
+    for name, generator in [("Length.primes", length_primes), ("sieve_primes", sieve_primes)]:
+        start = time.time()
+        prime = next(itertools.islice(generator(), 1999, None))
+        print(f"     2000-te Primzahl mit {name}: {prime} in {time.time() - start:.3f} s")
@@ -0,0 +1,216 @@
+"""
+__author__ = "Filip Ilic"
+__email__ = "filip.ilic@htl.rennweg.at"
+__version__ = "1.0.0"
+__copyright__ = "Copyright 2024"
+__license__ = "GPL"
+__status__ = "Development"
+"""
+
+import hashlib
+import heapq
+import itertools
+import math
+from array import array
+from typing import Dict, Hashable, List, Tuple
+
+
+def hash64(item: Hashable) -> int:
+    """
+    Stabiler 64-Bit-Hash (unabhängig von PYTHONHASHSEED), damit Sketches aus verschiedenen Prozessen
+    zusammengeführt werden können.
+
+    :param item: Element, wird mit str() in Bytes umgewandelt
+    :return: 64-Bit-Hash
+
+    >>> hash64("127.0.0.1") == hash64("127.0.0.1")
+    True
+    """
+    return int.from_bytes(hashlib.blake2b(str(item).encode(), digest_size=8).digest(), "little")
+
+
+class CountMinSketch:
+    """
+    Count-Min Sketch: schätzt die Häufigkeit von Elementen mit festem Speicher.
+    Die Schätzung ist nie zu klein und mit Wahrscheinlichkeit 1 - delta höchstens um epsilon * n zu groß
+    (n = Anzahl aller gezählten Elemente).
+
+    >>> cms = CountMinSketch(0.01, 0.01)
+    >>> for ip in ["a", "b", "a", "c", "a"]:
+    ...     _ = cms.add(ip)
+    >>> cms.estimate("a"), cms.estimate("b")
+    (3, 1)
+    """
+
+    def __init__(self, epsilon: float = 0.001, delta: float = 0.01):
+        """
+        Constructor.
+        :param epsilon: relativer Fehler bezogen auf die Anzahl aller Elemente
+        :param delta: Wahrscheinlichkeit, dass der Fehler größer ist
+        """
+        self.width = math.ceil(math.e / epsilon)
+        self.depth = math.ceil(math.log(1 / delta))
+        self.tables = [array("Q", bytes(8 * self.width)) for _ in range(self.depth)]
+        self.total = 0
+
+    def _columns(self, item: Hashable) -> List[int]:
+        # Double Hashing: aus einem 64-Bit-Hash werden depth Spalten berechnet
+        h = hash64(item)
+        h1, h2 = h & 0xFFFFFFFF, h >> 32
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add(self, item: Hashable, count: int = 1) -> int:
+        """
+        Zählt item und liefert die neue Schätzung.
+        :param item:
+        :param count:
+        :return: geschätzte Häufigkeit von item
+        """
+        self.total += count
+        estimate = None
+        for table, column in zip(self.tables, self._columns(item)):
+            table[column] += count
+            estimate = table[column] if estimate is None else min(estimate, table[column])
+        return estimate
+
+    def estimate(self, item: Hashable) -> int:
+        """
+        Geschätzte Häufigkeit von item.
+        :param item:
+        :return:
+        """
+        return min(table[column] for table, column in zip(self.tables, self._columns(item)))
+
+    def merge(self, other: "CountMinSketch") -> None:
+        """
+        Addiert einen Sketch mit gleicher Größe dazu.
+        :param other:
+        """
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError("CountMinSketch must have the same width and depth.")
+        for table, other_table in zip(self.tables, other.tables):
+            for i, value in enumerate(other_table):
+                table[i] += value
+        self.total += other.total
+
+
+class SpaceSaving:
+    """
+    Space-Saving: merkt sich höchstens k Elemente mit Zähler. Ist die Tabelle voll, ersetzt ein neues Element
+    das Element mit dem kleinsten Zähler und übernimmt dessen Zähler + 1. Jedes Element, das öfter als n / k
+    vorkommt, ist garantiert in der Tabelle.
+
+    Das Element mit dem kleinsten Zähler liefert ein Min-Heap mit genau einem Eintrag pro Element. Zählen
+    ändert den Heap nicht, seine Zähler dürfen daher zu klein sein; erst beim Verdrängen werden veraltete
+    Einträge korrigiert und zurückgelegt. Ein Aufruf von add kostet damit amortisiert O(log k) statt O(k).
+
+    >>> top = SpaceSaving(2)
+    >>> for url in ["/", "/a", "/", "/b", "/", "/a"]:
+    ...     top.add(url)
+    >>> top.top(1)
+    [('/', 3)]
+    >>> sorted(top.counts.items()), sorted(top.errors.items())
+    ([('/', 3), ('/a', 3)], [('/', 0), ('/a', 2)])
+    """
+
+    def __init__(self, k: int = 100):
+        """
+        Constructor.
+        :param k: Anzahl der Zähler
+        """
+        self.k = k
+        self.counts: Dict[Hashable, int] = {}
+        self.errors: Dict[Hashable, int] = {}
+        # (Zähler, laufende Nummer, Element), die Nummer entscheidet bei gleichem Zähler statt des Elements
+        self._heap: List[Tuple[int, int, Hashable]] = []
+        self._sequence = itertools.count()
+
+    def add(self, item: Hashable, count: int = 1) -> None:
+        """
+        Zählt item.
+        :param item:
+        :param count:
+        """
+        counts = self.counts
+        if item in counts:
+            counts[item] += count
+        elif len(counts) < self.k:
+            counts[item] = count
+            self.errors[item] = 0
+            heapq.heappush(self._heap, (count, next(self._sequence), item))
+        else:
+            heap = self._heap
+            while True:
+                stored, _, victim = heap[0]
+                error = counts[victim]
+                if stored == error:
+                    break
+                heapq.heapreplace(heap, (error, next(self._sequence), victim))  # veralteter Zähler
+            del counts[victim]
+            del self.errors[victim]
+            counts[item] = error + count
+            self.errors[item] = error
+            heapq.heapreplace(heap, (error + count, next(self._sequence), item))
+
+    def top(self, n: int = 1) -> List[Tuple[Hashable, int]]:
+        """
+        Die n häufigsten Elemente mit ihren (höchstens um den Fehler zu großen) Zählern.
+        :param n:
+        :return:
+        """
+        return sorted(self.counts.items(), key=lambda x: x[1], reverse=True)[:n]
+
+
+class HyperLogLog:
+    """
+    HyperLogLog: schätzt die Anzahl verschiedener Elemente mit 2^precision Registern (je ein Byte).
+    Der relative Standardfehler ist etwa 1.04 / sqrt(2^precision).
+
+    >>> hll = HyperLogLog(error=0.01)
+    >>> for i in range(10000):
+    ...     hll.add(f"10.0.{i // 256}.{i % 256}")
+    >>> abs(hll.count() - 10000) < 300
+    True
+    """
+
+    def __init__(self, error: float = 0.01):
+        """
+        Constructor.
+        :param error: gewünschter relativer Standardfehler
+        """
+        self.precision = min(18, max(4, math.ceil(math.log2((1.04 / error) ** 2))))
+        self.m = 1 << self.precision
+        self.registers = bytearray(self.m)
+        self.alpha = 0.7213 / (1 + 1.079 / self.m)
+
+    def add(self, item: Hashable) -> None:
+        """
+        Fügt item hinzu.
+        :param item:
+        """
+        h = hash64(item)
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self) -> int:
+        """
+        Geschätzte Anzahl verschiedener Elemente.
+        :return:
+        """
+        estimate = self.alpha * self.m * self.m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            estimate = self.m * math.log(self.m / zeros)  # Linear Counting für kleine Mengen
+        return round(estimate)
+
+    def merge(self, other: "HyperLogLog") -> None:
+        """
+        Vereinigt mit einem HyperLogLog mit gleicher Genauigkeit.
+        :param other:
+        """
+        if self.precision != other.precision:
+            raise ValueError("HyperLogLog must have the same precision.")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
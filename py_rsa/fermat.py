@@ -6,7 +6,11 @@ __copyright__ = "Copyright 2024"
 __license__ = "GPL"
 __status__ = "Development"
 """
+import itertools
+import math
+import time
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 
 """
 Berechne (in Python) für jede der Primzahlen p = 2 bis p = 11 und p = 997:
@@ -39,6 +43,172 @@ def display(values, p):
           f" len(res)={total} - {list(counter.items())}")
 
 
+# Größe eines Bereichs, den ein Prozess auf einmal durchsucht (ein Byte pro Zahl und Flag)
+RANGE_SIZE = 1 << 24
+
+
+def multiplicative_order(a, p):
+    """
+    Ordnung von a modulo der Primzahl p: der kleinste Exponent k > 0 mit a^k ≡ 1 (mod p).
+
+    :param a: Basis, kein Vielfaches von p
+    :param p: Primzahl
+    :return: Ordnung, ein Teiler von p - 1
+
+    >>> multiplicative_order(2, 7), multiplicative_order(2, 11), multiplicative_order(2, 31)
+    (3, 10, 5)
+    """
+    order = p - 1
+    rest = p - 1
+    factor = 2
+    while rest > 1:
+        if factor * factor > rest:
+            factor = rest
+        if rest % factor == 0:
+            while rest % factor == 0:
+                rest //= factor
+            while order % factor == 0 and pow(a, order // factor, p) == 1:
+                order //= factor
+        factor += 1
+    return order
+
+
+def is_carmichael(n):
+    """
+    Korselt-Kriterium: n ist eine Carmichael-Zahl, wenn n zusammengesetzt und quadratfrei ist und p - 1 ein Teiler
+    von n - 1 für jeden Primteiler p von n ist. Dann gilt a^(n-1) ≡ 1 (mod n) für alle a teilerfremd zu n.
+
+    :param n: zu testende Zahl
+    :return: True, wenn n eine Carmichael-Zahl ist
+
+    >>> [n for n in [561, 563, 1105, 1729, 341, 6601, 8911, 1194649] if is_carmichael(n)]
+    [561, 1105, 1729, 6601, 8911]
+    """
+    if n < 3 or n % 2 == 0:
+        return False
+    rest = n
+    factor = 3
+    while factor * factor <= rest:
+        if rest % factor == 0:
+            rest //= factor
+            if rest % factor == 0 or (n - 1) % (factor - 1):
+                return False
+        factor += 2
+    return rest != n and (n - 1) % (rest - 1) == 0
+
+
+def offset(low, residue, modulus):
+    """
+    Index der ersten Zahl >= low mit Rest residue modulo modulus.
+    """
+    return (residue - low) % modulus
+
+
+def scan_range(bounds):
+    """
+    Fermatsche Pseudoprimzahlen zur Basis 2 im Bereich [low, high) (läuft in einem Worker-Prozess).
+
+    Statt für jede Zahl zu potenzieren, wird gesiebt: eine zusammengesetzte Zahl n ist genau dann eine
+    Pseudoprimzahl zur Basis 2, wenn für jeden Primteiler p gilt, dass die Ordnung d von 2 modulo p n - 1 teilt,
+    also n ≡ p (mod p * d). Für jede Primzahl p <= sqrt(high) werden alle Vielfachen von p außer dieser Restklasse
+    gestrichen (drei Slice-Zuweisungen auf einem bytearray), dazu die Vielfachen von p² (außer bei Wieferich-
+    Primzahlen, da ist die Ordnung modulo p² gleich). Nur die übrigen zusammengesetzten Zahlen, etwa 5 %, werden
+    mit pow geprüft, weil ein Primteiler > sqrt(high) beim Sieben nicht erfasst wird.
+
+    :param bounds: (low, high)
+    :return: Liste der Pseudoprimzahlen
+
+    >>> scan_range((0, 3000))
+    [341, 561, 645, 1105, 1387, 1729, 1905, 2047, 2465, 2701, 2821]
+    """
+    low, high = bounds
+    low = max(low, 3)
+    size = high - low
+    if size <= 0:
+        return []
+    bad = bytearray(size)
+    composite = bytearray(size)
+    first = offset(low, 0, 2)
+    bad[first::2] = bytes([1]) * len(range(first, size, 2))  # gerade Zahlen
+
+    for p in odd_primes(math.isqrt(high - 1)):
+        ones = bytes([1])
+        # zusammengesetzt: Vielfache von p ab p²
+        first = max(offset(low, 0, p), p * p - low)
+        composite[first::p] = ones * len(range(first, size, p))
+
+        # alle Vielfachen von p ab 2p streichen, die Restklasse p mod p * d bleibt, wie sie war
+        modulus = p * multiplicative_order(2, p)
+        good = offset(low, p, modulus)
+        if low + good == p:
+            good += modulus
+        saved = bad[good::modulus]
+        first = offset(low, 0, p)
+        if low + first == p:
+            first += p
+        bad[first::p] = ones * len(range(first, size, p))
+        bad[good::modulus] = saved
+
+        if pow(2, p - 1, p * p) != 1:  # keine Wieferich-Primzahl
+            first = offset(low, 0, p * p)
+            bad[first::p * p] = ones * len(range(first, size, p * p))
+
+    # übrig: zusammengesetzt und nicht gestrichen
+    survivors = (int.from_bytes(composite, "little") & ~int.from_bytes(bad, "little")).to_bytes(size, "little")
+    return [n for n in itertools.compress(range(low, high), survivors) if pow(2, n - 1, n) == 1]
+
+
+def odd_primes(limit):
+    """
+    Ungerade Primzahlen <= limit.
+
+    >>> odd_primes(20)
+    [3, 5, 7, 11, 13, 17, 19]
+    """
+    flags = bytearray([1]) * (limit + 1)
+    for i in range(2, math.isqrt(limit) + 1):
+        if flags[i]:
+            flags[i * i::i] = bytes(len(range(i * i, limit + 1, i)))
+    return [i for i in range(3, limit + 1, 2) if flags[i]]
+
+
+def scan_pseudoprimes(limit, jobs=1, range_size=RANGE_SIZE):
+    """
+    Alle Fermatschen Pseudoprimzahlen zur Basis 2 und alle Carmichael-Zahlen unter limit. Die Bereiche werden mit
+    jobs > 1 in mehreren Prozessen durchsucht. Jede Carmichael-Zahl ist (ungerade) auch eine Pseudoprimzahl zur
+    Basis 2, deshalb wird das Korselt-Kriterium nur für diese geprüft.
+
+    :param limit: obere Grenze (exklusiv)
+    :param jobs: Anzahl der Prozesse
+    :param range_size: Größe der Bereiche
+    :return: (Pseudoprimzahlen, Carmichael-Zahlen)
+
+    >>> pseudoprimes, carmichaels = scan_pseudoprimes(10 ** 6, range_size=100000)
+    >>> len(pseudoprimes), len(carmichaels), carmichaels[:6]
+    (245, 43, [561, 1105, 1729, 2465, 2821, 6601])
+    """
+    ranges = [(low, min(low + range_size, limit)) for low in range(0, limit, range_size)]
+    if jobs == 1:
+        pseudoprimes = [n for result in map(scan_range, ranges) for n in result]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            pseudoprimes = [n for result in executor.map(scan_range, ranges) for n in result]
+    return pseudoprimes, [n for n in pseudoprimes if is_carmichael(n)]
+
+
+def scan_pow(limit):
+    """
+    Bisherige Methode zum Vergleich: für jede ungerade Zahl pow(2, n - 1, n) und für die, die den Test bestehen,
+    Primzahltest und Korselt-Kriterium.
+
+    :param limit: obere Grenze (exklusiv)
+    :return: (Pseudoprimzahlen, Carmichael-Zahlen)
+    """
+    from py_rsa.miller_rabin import is_prime
+    pseudoprimes = [n for n in range(3, limit, 2) if pow(2, n - 1, n) == 1 and not is_prime(n)]
+    return pseudoprimes, [n for n in pseudoprimes if is_carmichael(n)]
+
+
 if __name__ == '__main__':
     primes = list(range(2, 12)) + [997]
     non_primes = [9, 15, 21, 551, 552, 553, 554, 555, 556, 557, 558, 559, 560, 561, 562,
@@ -51,3 +221,13 @@ if __name__ == '__main__':
     print("\nErgebnisse für Nicht-Primzahlen:")
     for p in non_primes:
         display(fermat(p), p)
+
+    print("\nCarmichael-Zahlen unter den Nicht-Primzahlen:", [p for p in non_primes if is_carmichael(p)])
+
+    print("\nPseudoprimzahlen zur Basis 2 und Carmichael-Zahlen, Sieb gegen pow:")
+    for limit in [10 ** 6, 10 ** 8]:
+        for name, scan in [("pow", scan_pow), ("Sieb", scan_pseudoprimes)]:
+            start = time.perf_counter()
+            pseudoprimes, carmichaels = scan(limit)
+            print(f"{limit:>10} {name:>5}: {len(pseudoprimes)} Pseudoprimzahlen, {len(carmichaels)} Carmichael-Zahlen "
+                  f"in {time.perf_counter() - start:.2f} s")
@@ -0,0 +1,292 @@
+"""
+__author__ = "Filip Ilic"
+__email__ = "filip.ilic@htl.rennweg.at"
+__version__ = "1.0.0"
+__copyright__ = "Copyright 2024"
+__license__ = "GPL"
+__status__ = "Development"
+"""
+import math
+import multiprocessing
+import queue
+import secrets
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import NamedTuple
+
+from py_rsa.miller_rabin import next_prime
+
+# Standard-Exponent für den öffentlichen Schlüssel
+PUBLIC_EXPONENT = 65537
+
+
+class RSAKey(NamedTuple):
+    """
+    RSA-Schlüsselpaar mit den Parametern für den chinesischen Restsatz (CRT).
+    Der öffentliche Schlüssel ist (n, e).
+    """
+    n: int
+    e: int
+    d: int
+    p: int
+    q: int
+    dp: int  # d mod (p - 1)
+    dq: int  # d mod (q - 1)
+    qinv: int  # q^-1 mod p
+
+
+def key_from_primes(p, q, e=PUBLIC_EXPONENT):
+    """
+    Berechnet das Schlüsselpaar aus den Primzahlen p und q.
+
+    :param p: Primzahl
+    :param q: Primzahl != p
+    :param e: öffentlicher Exponent, teilerfremd zu (p - 1) * (q - 1)
+    :return: RSAKey
+
+    >>> key = key_from_primes(61, 53, 17)
+    >>> key.n, key.d, key.dp, key.dq, key.qinv
+    (3233, 2753, 53, 49, 38)
+    >>> key_from_primes(7, 11, 3)
+    Traceback (most recent call last):
+    ...
+    ValueError: e must be coprime to (p - 1) * (q - 1).
+    """
+    if p == q:
+        raise ValueError("p and q must be different.")
+    phi = (p - 1) * (q - 1)
+    if math.gcd(e, phi) != 1:
+        raise ValueError("e must be coprime to (p - 1) * (q - 1).")
+    if p < q:
+        p, q = q, p  # p > q, wie in PKCS #1 üblich
+    d = pow(e, -1, phi)
+    return RSAKey(p * q, e, d, p, q, d % (p - 1), d % (q - 1), pow(q, -1, p))
+
+
+# Abbruch-Event der Worker-Prozesse, wird im Initializer gesetzt
+worker_stop = None
+
+
+def init_worker(stop):
+    global worker_stop
+    worker_stop = stop
+
+
+def search_prime(bits, e=PUBLIC_EXPONENT):
+    """
+    Sucht eine Primzahl p mit bits Bits und gcd(e, p - 1) = 1 (läuft in einem Worker-Prozess).
+    Die zwei höchsten Bits sind gesetzt, damit das Produkt zweier solcher Primzahlen 2 * bits Bits hat.
+    Der Startwert kommt aus secrets, nicht aus random.
+
+    :param bits: Bitlänge
+    :param e: öffentlicher Exponent
+    :return: Primzahl, None wenn die Suche abgebrochen wurde
+    """
+    while worker_stop is None or not worker_stop.is_set():
+        prime = next_prime(secrets.randbits(bits) | (3 << (bits - 2)), worker_stop)
+        if prime is not None and prime.bit_length() == bits and math.gcd(e, prime - 1) == 1:
+            return prime
+    return None
+
+
+class KeyGenerator:
+    """
+    Erzeugt Schlüsselpaare: jobs Worker-Prozesse suchen gleichzeitig nach Primzahlen, sobald p und q gefunden
+    sind, werden die übrigen Suchen abgebrochen.
+
+    >>> with KeyGenerator(jobs=2) as generator:
+    ...     key = generator.generate(512)
+    >>> key.n.bit_length(), pow(pow(42, key.e, key.n), key.d, key.n)
+    (512, 42)
+    >>> with KeyGenerator(jobs=1) as generator:
+    ...     generator.cancel()  # keine laufende Erzeugung, wirkt sich nicht auf die nächste aus
+    ...     key = generator.generate(256)
+    ...     odd = generator.generate(255)
+    >>> key.n.bit_length(), odd.n.bit_length()
+    (256, 255)
+    """
+
+    def __init__(self, jobs=None):
+        """
+        Constructor. Startet die Worker-Prozesse.
+        :param jobs: Anzahl der Prozesse (Standard: Anzahl der CPUs)
+        """
+        self.jobs = jobs or multiprocessing.cpu_count()
+        self._stop = multiprocessing.Event()
+        self._executor = ProcessPoolExecutor(self.jobs, initializer=init_worker, initargs=(self._stop,))
+
+    def generate(self, bits=2048, e=PUBLIC_EXPONENT):
+        """
+        Erzeugt ein Schlüsselpaar mit einem Modul von bits Bits.
+
+        :param bits: Bitlänge von n
+        :param e: öffentlicher Exponent
+        :return: RSAKey
+        """
+        sizes = ((bits + 1) // 2, bits // 2)  # bei ungeradem bits ist p ein Bit länger als q
+        primes = [None, None]
+        self._stop.clear()  # ein cancel() vor diesem Aufruf gilt nicht für ihn
+        pending = {self._executor.submit(search_prime, sizes[i % 2], e): sizes[i % 2] for i in range(self.jobs)}
+        try:
+            while None in primes:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    size = pending.pop(future)
+                    prime = future.result()
+                    if prime is None:
+                        raise RuntimeError("Key generation was cancelled.")
+                    for i in range(2):
+                        if primes[i] is None and sizes[i] == size and prime not in primes:
+                            primes[i] = prime
+                            break
+                missing = [size for size, prime in zip(sizes, primes) if prime is None]
+                if missing:
+                    # für jede fertige Suche eine neue für eine noch fehlende Größe starten
+                    for i in range(len(done)):
+                        size = missing[i % len(missing)]
+                        pending[self._executor.submit(search_prime, size, e)] = size
+        finally:
+            # übrige Suchen abbrechen: noch nicht gestartete verwerfen, laufende über das Event beenden
+            self._stop.set()
+            for future in pending:
+                future.cancel()
+            wait(pending)
+            self._stop.clear()
+        return key_from_primes(primes[0], primes[1], e)
+
+    def cancel(self):
+        """
+        Bricht eine laufende Erzeugung (aus einem anderen Thread) ab, generate wirft dann einen RuntimeError.
+        Läuft gerade keine Erzeugung, hat cancel keine Wirkung: generate setzt den Abbruch zu Beginn zurück.
+        """
+        self._stop.set()
+
+    def close(self):
+        """
+        Beendet die Worker-Prozesse.
+        """
+        self._executor.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def generate_keypair(bits=2048, e=PUBLIC_EXPONENT, jobs=None):
+    """
+    Erzeugt ein Schlüsselpaar mit einem eigenen KeyGenerator.
+
+    :param bits: Bitlänge von n
+    :param e: öffentlicher Exponent
+    :param jobs: Anzahl der Prozesse
+    :return: RSAKey
+    """
+    with KeyGenerator(jobs) as generator:
+        return generator.generate(bits, e)
+
+
+class KeyPool:
+    """
+    Vorrat an fertigen Schlüsselpaaren: ein Hintergrund-Thread füllt eine begrenzte Queue mit einem KeyGenerator
+    auf, get() liefert sofort einen Schlüssel, solange der Vorrat reicht.
+
+    >>> with KeyPool(bits=512, size=2, jobs=2) as pool:
+    ...     keys = [pool.get() for _ in range(3)]
+    >>> len({key.n for key in keys}), keys[0].n.bit_length()
+    (3, 512)
+    """
+
+    def __init__(self, bits=2048, size=4, e=PUBLIC_EXPONENT, jobs=None):
+        """
+        Constructor. Startet den Hintergrund-Thread.
+        :param bits: Bitlänge von n
+        :param size: Anzahl der Schlüssel im Vorrat
+        :param e: öffentlicher Exponent
+        :param jobs: Anzahl der Prozesse
+        """
+        self.bits = bits
+        self.e = e
+        self._queue = queue.Queue(maxsize=size)
+        self._generator = KeyGenerator(jobs)
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._fill, daemon=True)
+        self._thread.start()
+
+    def _fill(self):
+        while not self._closed.is_set():
+            try:
+                key = self._generator.generate(self.bits, self.e)
+            except Exception as error:
+                if self._closed.is_set():
+                    return
+                key = error
+            while not self._closed.is_set():
+                try:
+                    self._queue.put(key, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+
+    def get(self, timeout=None):
+        """
+        Nimmt einen Schlüssel aus dem Vorrat, wartet, wenn er leer ist.
+
+        :param timeout: maximale Wartezeit in Sekunden
+        :return: RSAKey
+        """
+        key = self._queue.get(timeout=timeout)
+        if isinstance(key, Exception):
+            raise key
+        return key
+
+    def __len__(self):
+        return self._queue.qsize()
+
+    def close(self):
+        """
+        Beendet den Hintergrund-Thread und die Worker-Prozesse.
+        """
+        self._closed.set()
+        # cancel wirkt nur auf eine laufende Erzeugung, daher wiederholen, falls generate gerade erst beginnt
+        while self._thread.is_alive():
+            self._generator.cancel()
+            self._thread.join(0.1)
+        self._generator.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def benchmark(bit_lengths=(2048, 4096), seconds=60):
+    """
+    Benchmark: Schlüssel pro Minute mit einem Prozess und mit allen CPUs.
+
+    :param bit_lengths: Bitlängen von n
+    :param seconds: Messdauer pro Bitlänge und Variante
+    """
+    for bits in bit_lengths:
+        for jobs in sorted({1, multiprocessing.cpu_count()}):
+            with KeyGenerator(jobs) as generator:
+                count = 0
+                start = time.perf_counter()
+                while time.perf_counter() - start < seconds:
+                    generator.generate(bits)
+                    count += 1
+                elapsed = time.perf_counter() - start
+            print(f"{bits:>5} Bit, {jobs:>2} Prozesse: {count / elapsed * 60:.1f} Schlüssel pro Minute")
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+
+    key = generate_keypair(2048)
+    print(f"n = {key.n}\ne = {key.e}\nd = {key.d}")
+
+    benchmark()
@@ -6,7 +6,11 @@ __copyright__ = "Copyright 2024"
 __license__ = "GPL"
 __status__ = "Development"
 """
+import itertools
+import math
 import random
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 FIRST_100_PRIMES = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29,
                     31, 37, 41, 43, 47, 53, 59, 61, 67, 71,
@@ -20,60 +24,281 @@ FIRST_100_PRIMES = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29,
                     467, 479, 487, 491, 499, 503, 509, 521, 523, 541]
 
 
+# Produkt der ersten 100 Primzahlen: ein gcd statt 100 Divisionen
+PRIMORIAL = math.prod(FIRST_100_PRIMES)
+
+# Deterministische Basen: für number < Grenze liefert Miller-Rabin mit diesen Basen ein sicheres Ergebnis
+DETERMINISTIC_BASES = [
+    (2047, (2,)),
+    (1373653, (2, 3)),
+    (25326001, (2, 3, 5)),
+    (3215031751, (2, 3, 5, 7)),
+    (2152302898747, (2, 3, 5, 7, 11)),
+    (3474749660383, (2, 3, 5, 7, 11, 13)),
+    (341550071728321, (2, 3, 5, 7, 11, 13, 17)),
+    (3825123056546413051, (2, 3, 5, 7, 11, 13, 17, 19, 23)),
+    (318665857834031151167461, (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)),
+    (3317044064679887385961981, (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)),
+]
+
+
 def is_prime(number):
     """
-    Teste die ersten 100 Primzahlen auf Primzahl.
+    Primzahltest: gcd mit dem Produkt der ersten 100 Primzahlen, dann Miller-Rabin mit deterministischen Basen
+    für number < 3.3 * 10^24, darüber Baillie-PSW (Miller-Rabin zur Basis 2 und starker Lucas-Test, es ist keine
+    Zahl bekannt, bei der das falsch ist).
+
+    :param number: Die zu testende Zahl
+    :return: True, wenn number eine Primzahl ist
+
+    >>> [n for n in range(60) if is_prime(n)]
+    [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47, 53, 59]
+    >>> all(is_prime(n) == all(n % d for d in range(2, math.isqrt(n) + 1)) for n in range(2, 20000))
+    True
+    >>> is_prime(561), is_prime(3215031751), is_prime(24566544301293587), is_prime(2 ** 127 - 1)
+    (False, False, True, True)
+    >>> is_prime((2 ** 89 - 1) * (2 ** 107 - 1))
+    False
     """
-    for prime in FIRST_100_PRIMES:
-        if number % prime == 0:
-            return number == prime
+    if number < 2:
+        return False
+    if number <= FIRST_100_PRIMES[-1]:
+        return number in SMALL_PRIMES
+    if math.gcd(number, PRIMORIAL) != 1:
+        return False
+    if number < FIRST_100_PRIMES[-1] ** 2:
+        return True
 
-    return is_prim_millerrabin(number) == "probably prime"
+    exponent, odd_part = split_exponent(number - 1)
+    for limit, bases in DETERMINISTIC_BASES:
+        if number < limit:
+            return not any(is_composite(base, odd_part, number, exponent) for base in bases)
+    return not is_composite(2, odd_part, number, exponent) and is_strong_lucas_probable_prime(number)
 
 
-def is_prim_millerrabin(number, iterations=20):
+SMALL_PRIMES = frozenset(FIRST_100_PRIMES)
+
+
+def is_prime_many(numbers, jobs=1):
+    """
+    Batch-API: testet viele Zahlen, mit jobs > 1 verteilt auf mehrere Prozesse.
+
+    :param numbers: Iterable von Zahlen
+    :param jobs: Anzahl der Prozesse
+    :return: Liste mit True/False in der Reihenfolge von numbers
+
+    >>> is_prime_many([221, 223, 2 ** 61 - 1])
+    [False, True, True]
+    """
+    numbers = list(numbers)
+    if jobs == 1:
+        return [is_prime(number) for number in numbers]
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(is_prime, numbers, chunksize=max(1, len(numbers) // (4 * jobs))))
+
+
+def split_exponent(number):
+    """
+    Zerlegt number in odd_part * 2^exponent.
+
+    :return: (exponent, odd_part)
+
+    >>> split_exponent(40)
+    (3, 5)
+    """
+    exponent = (number & -number).bit_length() - 1
+    return exponent, number >> exponent
+
+
+def is_composite(base, odd_part, number, exponent):
     """
-    Teste die ersten 100 Primzahlen auf Primzahl mittels Miller-Rabin-Test. Mindestens 20 Iterationen.
-    """
-    if number % 2 == 0 or number < 2:
-        return "composite"
-
-    # number - 1 = odd_part*2^exponent - 1
-    exponent, odd_part = 0, number - 1
-    while odd_part % 2 == 0:
-        odd_part //= 2
-        exponent += 1
-
-    def is_composite(base, odd_part, number, exponent):
-        """
-        Teste, ob die Zahl zusammengesetzt ist.
-
-        :param base: Basis
-        :param odd_part: ungerader Teil von number - 1
-        :param number: Die zu testende Zahl
-        :param exponent: Exponent der die Zahl in die Form number - 1 = odd_part*2^exponent - 1 bringt
-        :return: True, wenn die Zahl zusammengesetzt ist, sonst False
-        """
-        base_power = pow(base, odd_part, number)
-        if base_power in (1, number - 1):
+    Teste, ob die Zahl zusammengesetzt ist (eine Runde Miller-Rabin).
+
+    :param base: Basis
+    :param odd_part: ungerader Teil von number - 1
+    :param number: Die zu testende Zahl
+    :param exponent: Exponent der die Zahl in die Form number - 1 = odd_part*2^exponent bringt
+    :return: True, wenn die Zahl zusammengesetzt ist, sonst False
+    """
+    base_power = pow(base, odd_part, number)
+    if base_power in (1, number - 1):
+        return False
+    for _ in range(exponent - 1):
+        base_power = pow(base_power, 2, number)
+        if base_power == number - 1:
             return False
-        for _ in range(exponent - 1):
-            base_power = pow(base_power, 2, number)
-            if base_power == number - 1:
-                return False
+    return True
+
+
+def jacobi(a, n):
+    """
+    Jacobi-Symbol (a/n) für ungerades n > 0.
+
+    >>> jacobi(5, 21), jacobi(2, 3), jacobi(3, 9)
+    (1, -1, 0)
+    """
+    a %= n
+    result = 1
+    while a:
+        while a % 2 == 0:
+            a //= 2
+            if n % 8 in (3, 5):
+                result = -result
+        a, n = n, a
+        if a % 4 == 3 and n % 4 == 3:
+            result = -result
+        a %= n
+    return result if n == 1 else 0
+
+
+def is_strong_lucas_probable_prime(number):
+    """
+    Starker Lucas-Test mit den Parametern nach Selfridge (D = 5, -7, 9, ... mit (D/number) = -1, P = 1,
+    Q = (1 - D) / 4). Zusammen mit Miller-Rabin zur Basis 2 ergibt das den Baillie-PSW-Test.
+
+    :param number: ungerade Zahl > 2
+    :return: False, wenn number sicher zusammengesetzt ist
+
+    >>> is_strong_lucas_probable_prime(2 ** 89 - 1), is_strong_lucas_probable_prime(5459)
+    (True, True)
+    >>> [n for n in range(3, 6000, 2) if is_strong_lucas_probable_prime(n) and not is_prime(n)]
+    [5459, 5777]
+    """
+    if math.isqrt(number) ** 2 == number:
+        return False  # für Quadratzahlen gibt es kein D mit (D/number) = -1
+    d = 5
+    while True:
+        symbol = jacobi(d, number)
+        if symbol == -1:
+            break
+        if symbol == 0 and abs(d) != number:
+            return False
+        d = -d - 2 if d > 0 else -d + 2
+    p, q = 1, (1 - d) // 4
+
+    exponent, odd_part = split_exponent(number + 1)
+    # U_k, V_k, Q^k für k = 1, dann binär bis k = odd_part
+    u, v, q_k = 1, p, q
+    for bit in bin(odd_part)[3:]:
+        u, v, q_k = u * v % number, (v * v - 2 * q_k) % number, q_k * q_k % number
+        if bit == "1":
+            u, v = p * u + v, d * u + p * v
+            u = ((u + number if u & 1 else u) >> 1) % number
+            v = ((v + number if v & 1 else v) >> 1) % number
+            q_k = q_k * q % number
+    if u == 0 or v == 0:
         return True
+    for _ in range(exponent - 1):
+        v = (v * v - 2 * q_k) % number
+        if v == 0:
+            return True
+        q_k = q_k * q_k % number
+    return False
+
 
+def is_prim_millerrabin(number, iterations=20):
+    """
+    Miller-Rabin-Test mit zufälligen Basen. Mindestens 20 Iterationen.
+
+    :param number: Die zu testende Zahl
+    :param iterations: Anzahl der Runden
+    :return: True, wenn number wahrscheinlich eine Primzahl ist, False, wenn sie zusammengesetzt ist
+
+    >>> is_prim_millerrabin(2 ** 61 - 1), is_prim_millerrabin(561)
+    (True, False)
+    """
+    if number < 5 or number % 2 == 0:
+        return number in (2, 3)
+
+    exponent, odd_part = split_exponent(number - 1)
     for _ in range(iterations):
         base = random.randint(2, number - 2)
         if is_composite(base, odd_part, number, exponent):
-            return "composite"
+            return False
+
+    return True
 
-    return "probably prime"
+
+def small_odd_primes(limit):
+    """
+    Ungerade Primzahlen unter limit (Sieb des Eratosthenes).
+
+    >>> small_odd_primes(20)
+    [3, 5, 7, 11, 13, 17, 19]
+    """
+    flags = bytearray([1]) * limit
+    flags[:2] = b"\x00\x00"
+    for i in range(2, math.isqrt(limit) + 1):
+        if flags[i]:
+            flags[i * i::i] = bytes(len(range(i * i, limit, i)))
+    return [i for i in range(3, limit, 2) if flags[i]]
+
+
+# Primzahlen, mit denen die Kandidaten gesiebt werden, und Anzahl ungerader Kandidaten pro Fenster
+SIEVE_PRIMES = small_odd_primes(1 << 15)
+SIEVE_WINDOW = 4096
+
+
+def next_prime(number, stop=None):
+    """
+    Die kleinste Primzahl > number. Die ungeraden Kandidaten werden in Fenstern von SIEVE_WINDOW Zahlen mit den
+    SIEVE_PRIMES gesiebt, nur die übrig gebliebenen Zahlen werden mit is_prime getestet. Die Reste number % p werden
+    nur einmal berechnet und von Fenster zu Fenster weitergezählt.
+
+    :param number: Startwert
+    :param stop: Event (threading oder multiprocessing), bricht die Suche nach dem aktuellen Fenster ab
+    :return: nächste Primzahl, None nach einem Abbruch
+
+    >>> next_prime(0), next_prime(2), next_prime(24566544301293569)
+    (2, 3, 24566544301293587)
+    >>> all(next_prime(n) == min(p for p in range(n + 1, 2 * n + 3) if is_prime(p)) for n in range(3000))
+    True
+    >>> next_prime(2 ** 512) - 2 ** 512
+    75
+    """
+    if number < SIEVE_PRIMES[-1]:
+        candidate = number + 1
+        while not is_prime(candidate):
+            candidate += 1
+        return candidate
+
+    start = (number + 1) | 1
+    residues = [start % p for p in SIEVE_PRIMES]
+    while True:
+        flags = bytearray([1]) * SIEVE_WINDOW
+        for p, residue in zip(SIEVE_PRIMES, residues):
+            # erster Index i mit start + 2 * i ≡ 0 (mod p), (p + 1) // 2 ist das Inverse von 2
+            index = (p - residue) * ((p + 1) // 2) % p
+            flags[index::p] = bytes(len(range(index, SIEVE_WINDOW, p)))
+        for index in itertools.compress(range(SIEVE_WINDOW), flags):
+            candidate = start + 2 * index
+            if is_prime(candidate):
+                return candidate
+        if stop is not None and stop.is_set():
+            return None
+        start += 2 * SIEVE_WINDOW
+        residues = [(residue + 2 * SIEVE_WINDOW) % p for p, residue in zip(SIEVE_PRIMES, residues)]
 
 
 def generate_prime(bit_length):
     """
-    Generiere eine Primzahl mit einer bestimmten Bitlänge.
+    Generiere eine Primzahl mit einer bestimmten Bitlänge: die nächste Primzahl nach einer zufälligen Zahl mit
+    dieser Bitlänge (gesiebte Suche, siehe next_prime).
+
+    >>> generate_prime(512).bit_length()
+    512
+    """
+    while True:
+        # Setze das höchste Bit, um sicherzustellen, dass die Zahl die richtige Bitlänge hat
+        prime = next_prime(random.getrandbits(bit_length) | (1 << (bit_length - 1)))
+        if prime.bit_length() == bit_length:
+            return prime
+
+
+def generate_prime_random(bit_length):
+    """
+    Generiere eine Primzahl mit einer bestimmten Bitlänge, bisherige Version: für jeden Kandidaten eine neue
+    Zufallszahl und der volle Test. Nur noch für den Vergleich im Benchmark.
     """
     while True:
         prime_candidate = random.getrandbits(bit_length)
@@ -84,17 +309,43 @@ def generate_prime(bit_length):
             return prime_candidate
 
 
+def benchmark(bit_lengths=(64, 512, 1024, 2048), count=200):
+    """
+    Benchmark: Tests pro Sekunde für zufällige ungerade Zahlen und für Primzahlen, alter Test (100 Divisionen und
+    20 zufällige Miller-Rabin-Runden) gegen is_prime.
+
+    :param bit_lengths: Bitlängen
+    :param count: Anzahl Zahlen pro Bitlänge
+    """
+    def old_is_prime(number):
+        for prime in FIRST_100_PRIMES:
+            if number % prime == 0:
+                return number == prime
+        return is_prim_millerrabin(number)
+
+    for bit_length in bit_lengths:
+        candidates = [random.getrandbits(bit_length) | (1 << (bit_length - 1)) | 1 for _ in range(count)]
+        primes = [generate_prime(bit_length) for _ in range(max(1, count // 20))]
+        for name, numbers in [("zufällig", candidates), ("Primzahlen", primes)]:
+            for test_name, test in [("alt", old_is_prime), ("is_prime", is_prime)]:
+                start = time.perf_counter()
+                for number in numbers:
+                    test(number)
+                elapsed = time.perf_counter() - start
+                print(f"{bit_length:>5} Bit, {name:>10}, {test_name:>8}: {len(numbers) / elapsed:10.0f} Tests/s")
+
+
 if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+
     print("Teste Miller-Rabin-Algorithmus:")
     test_numbers = [221, 24566544301293569, 2512]
     for number in test_numbers:
         print(f"Die Zahl {number} ist {'eine Primzahl' if is_prime(number) else 'keine Primzahl'}")
 
     print("\nErste Primzahl mit mehr als 512 Bits:")
-    number = pow(2, 512) + 1
-    while not is_prime(number):
-        number += 2
-    print(number)
+    print(next_prime(pow(2, 512)))
 
     print("\nVersteckte Nachricht in 24566544301293569 als Binärzahl mot 12 Zeichen/Zeile:")
     binary = bin(24566544301293569)[2:]
@@ -106,10 +357,7 @@ if __name__ == '__main__':
     print(ascii)
 
     print("\nNächst höhere Primzahl von 24566544301293569:")
-    prime_higher = 24566544301293570
-    while not is_prime(prime_higher):
-        prime_higher += 1
-    print(prime_higher)
+    print(next_prime(24566544301293569))
 
     print("\nVersteckte Nachricht in nächst höhere Prim als Binärzahl mot 12 Zeichen/Zeile:")
     binary = bin(24566544301293587)[2:]
@@ -126,3 +374,13 @@ if __name__ == '__main__':
     xor = "".join([str(int(binary1[i]) ^ int(binary2[i])) for i in range(len(binary1))])
     for i in range(0, len(xor), 12):
         print(xor[i:i + 12])
+
+    print("\nBenchmark:")
+    benchmark()
+
+    print("\nPrimzahlen mit 2048 Bit erzeugen:")
+    for name, generator in [("zufällige Kandidaten", generate_prime_random), ("gesiebte Suche", generate_prime)]:
+        start = time.perf_counter()
+        for _ in range(10):
+            generator(2048)
+        print(f"{name:>20}: {(time.perf_counter() - start) / 10:.2f} s pro Primzahl")
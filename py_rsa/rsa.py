@@ -0,0 +1,186 @@
+"""
+__author__ = "Filip Ilic"
+__email__ = "filip.ilic@htl.rennweg.at"
+__version__ = "1.0.0"
+__copyright__ = "Copyright 2024"
+__license__ = "GPL"
+__status__ = "Development"
+"""
+import hashlib
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from py_rsa.keygen import RSAKey, key_from_primes, generate_keypair
+
+
+def encrypt_int(message, key):
+    """
+    RSA mit dem öffentlichen Schlüssel: message^e mod n.
+
+    >>> key = key_from_primes(61, 53, 17)
+    >>> encrypt_int(65, key)
+    2790
+    """
+    return pow(message, key.e, key.n)
+
+
+def decrypt_int(cipher, key):
+    """
+    RSA mit dem privaten Schlüssel über den chinesischen Restsatz: zwei Potenzen mit halb so langen Exponenten
+    und Moduln statt pow(cipher, d, n), etwa 3-4 Mal schneller.
+
+    >>> key = key_from_primes(61, 53, 17)
+    >>> decrypt_int(2790, key), decrypt_int_plain(2790, key)
+    (65, 65)
+    """
+    m1 = pow(cipher, key.dp, key.p)
+    m2 = pow(cipher, key.dq, key.q)
+    h = key.qinv * (m1 - m2) % key.p
+    return m2 + h * key.q
+
+
+def decrypt_int_plain(cipher, key):
+    """
+    RSA mit dem privaten Schlüssel ohne chinesischen Restsatz, nur noch für den Vergleich im Benchmark.
+    """
+    return pow(cipher, key.d, key.n)
+
+
+class RSACipher:
+    """
+    RSA für beliebige Bytes im Blockmodus. Blockgrößen und Schlüsselparameter werden einmal pro Schlüssel
+    berechnet, die *_many-Methoden verarbeiten viele Nachrichten mit demselben Schlüssel (optional in mehreren
+    Prozessen).
+
+    Ein Klartextblock hat k - 2 Bytes (k = Länge von n in Bytes) und bekommt ein Byte 0x01 vorangestellt, damit
+    führende Nullbytes und der kürzere letzte Block erhalten bleiben; jeder Geheimtextblock hat k Bytes.
+    Das ist Lehrbuch-RSA ohne zufälliges Padding (OAEP/PSS) und daher nicht für echte Geheimnisse gedacht.
+
+    >>> cipher = RSACipher(key_from_primes(2 ** 89 - 1, 2 ** 107 - 1))
+    >>> secret = cipher.encrypt(b"\\x00\\x00Hallo RSA, ein etwas laengerer Text ueber mehrere Bloecke")
+    >>> len(secret) % cipher.cipher_block, cipher.decrypt(secret)
+    (0, b'\\x00\\x00Hallo RSA, ein etwas laengerer Text ueber mehrere Bloecke')
+    >>> cipher.decrypt_many(cipher.encrypt_many([b"a", b"", b"bc"]))
+    [b'a', b'', b'bc']
+    >>> signature = cipher.sign(b"Nachricht")
+    >>> cipher.verify(b"Nachricht", signature), cipher.verify(b"nachricht", signature)
+    (True, False)
+    """
+
+    def __init__(self, key: RSAKey, jobs: int = 1):
+        """
+        Constructor.
+        :param key: RSAKey, für encrypt und verify genügen n und e
+        :param jobs: Anzahl der Prozesse für die *_many-Methoden
+        """
+        self.key = key
+        self.jobs = jobs
+        self.cipher_block = (key.n.bit_length() + 7) // 8
+        self.plain_block = self.cipher_block - 2
+        if self.plain_block < 1:
+            raise ValueError("n is too small for the block mode.")
+
+    def encrypt(self, data: bytes) -> bytes:
+        """
+        Verschlüsselt data blockweise mit dem öffentlichen Schlüssel.
+        """
+        n, e, size, plain = self.key.n, self.key.e, self.cipher_block, self.plain_block
+        return b"".join(pow(int.from_bytes(b"\x01" + data[i:i + plain], "big"), e, n).to_bytes(size, "big")
+                        for i in range(0, len(data), plain))
+
+    def decrypt(self, data: bytes) -> bytes:
+        """
+        Entschlüsselt data blockweise mit dem privaten Schlüssel (chinesischer Restsatz).
+        """
+        if len(data) % self.cipher_block:
+            raise ValueError("Ciphertext length must be a multiple of the block size.")
+        key, size = self.key, self.cipher_block
+        blocks = []
+        for i in range(0, len(data), size):
+            message = decrypt_int(int.from_bytes(data[i:i + size], "big"), key)
+            blocks.append(message.to_bytes((message.bit_length() + 7) // 8, "big")[1:])
+        return b"".join(blocks)
+
+    def sign(self, data: bytes) -> bytes:
+        """
+        Signiert den SHA-256-Hash von data mit dem privaten Schlüssel.
+        """
+        digest = int.from_bytes(hashlib.sha256(data).digest(), "big") % self.key.n
+        return decrypt_int(digest, self.key).to_bytes(self.cipher_block, "big")
+
+    def verify(self, data: bytes, signature: bytes) -> bool:
+        """
+        Prüft eine Signatur von sign mit dem öffentlichen Schlüssel.
+        """
+        digest = int.from_bytes(hashlib.sha256(data).digest(), "big") % self.key.n
+        return encrypt_int(int.from_bytes(signature, "big"), self.key) == digest
+
+    def _map(self, function, items):
+        if self.jobs == 1:
+            return list(map(function, items))
+        items = list(items)
+        with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+            return list(executor.map(function, items, chunksize=max(1, len(items) // (4 * self.jobs))))
+
+    def encrypt_many(self, messages):
+        """
+        Verschlüsselt viele Nachrichten mit demselben Schlüssel.
+        :param messages: Iterable von bytes
+        :return: Liste der Geheimtexte
+        """
+        return self._map(self.encrypt, messages)
+
+    def decrypt_many(self, ciphertexts):
+        """
+        Entschlüsselt viele Geheimtexte mit demselben Schlüssel.
+        :param ciphertexts: Iterable von bytes
+        :return: Liste der Klartexte
+        """
+        return self._map(self.decrypt, ciphertexts)
+
+    def sign_many(self, messages):
+        """
+        Signiert viele Nachrichten mit demselben Schlüssel.
+        :param messages: Iterable von bytes
+        :return: Liste der Signaturen
+        """
+        return self._map(self.sign, messages)
+
+
+def benchmark(bits=2048, size=256 * 1024):
+    """
+    Benchmark: Durchsatz in MB/s für Verschlüsseln, Entschlüsseln mit und ohne chinesischen Restsatz und Signieren.
+
+    :param bits: Bitlänge von n
+    :param size: Anzahl Bytes Klartext
+    """
+    import os
+
+    cipher = RSACipher(generate_keypair(bits, jobs=1))
+    data = os.urandom(size)
+    start = time.perf_counter()
+    secret = cipher.encrypt(data)
+    print(f"{'encrypt':>14}: {size / 1e6 / (time.perf_counter() - start):.3f} MB/s")
+
+    start = time.perf_counter()
+    assert cipher.decrypt(secret) == data
+    print(f"{'decrypt (CRT)':>14}: {size / 1e6 / (time.perf_counter() - start):.3f} MB/s")
+
+    blocks = [int.from_bytes(secret[i:i + cipher.cipher_block], "big")
+              for i in range(0, len(secret), cipher.cipher_block)]
+    start = time.perf_counter()
+    for block in blocks:
+        decrypt_int_plain(block, cipher.key)
+    print(f"{'decrypt (pow)':>14}: {size / 1e6 / (time.perf_counter() - start):.3f} MB/s")
+
+    messages = [data[i:i + 1024] for i in range(0, size, 1024)]
+    start = time.perf_counter()
+    cipher.sign_many(messages)
+    print(f"{'sign':>14}: {len(messages) / (time.perf_counter() - start):.0f} Signaturen/s")
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+
+    benchmark()